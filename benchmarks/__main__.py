@@ -0,0 +1,53 @@
+import argparse
+import sys
+
+from . import generate, reruns, run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Case Management System benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = subparsers.add_parser("generate", help="load a synthetic docket into the benchmark table")
+    generate_parser.add_argument("--size", choices=sorted(generate.SIZES), default="10k")
+    generate_parser.add_argument("--cases", type=int, help="exact number of cases (overrides --size)")
+    generate_parser.add_argument("--years", type=int, default=3, help="years of hearing history")
+    generate_parser.add_argument("--seed", type=int, default=0)
+    generate_parser.add_argument("--table", default=generate.DEFAULT_TABLE)
+
+    run_parser = subparsers.add_parser("run", help="time every Case/CaseController operation")
+    run_parser.add_argument("--table", default=generate.DEFAULT_TABLE)
+    run_parser.add_argument("--repeat", type=int, default=20)
+    run_parser.add_argument("--only", nargs="*", help="run benchmarks whose name contains any of these")
+    run_parser.add_argument("--save", metavar="PATH", help="write the machine-readable report here")
+    run_parser.add_argument("--baseline", metavar="PATH", help="compare against a saved report")
+    run_parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before failing")
+
+    reruns_parser = subparsers.add_parser("reruns", help="time page reruns: whole app versus page fragment")
+    reruns_parser.add_argument("--pages", nargs="*", default=list(reruns.PAGES))
+    reruns_parser.add_argument("--repeat", type=int, default=20)
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        count = args.cases or generate.SIZES[args.size]
+        generate.generate_docket(count, args.table, args.seed, args.years)
+        print(f"Generated {count} cases into {args.table}")
+        return 0
+    if args.command == "reruns":
+        print(reruns.format_reruns(reruns.run_reruns(args.pages, args.repeat)))
+        return 0
+
+    report = run.run_benchmarks(args.table, args.repeat, args.only)
+    print(run.format_report(report))
+    if args.save:
+        run.save_report(report, args.save)
+    if args.baseline:
+        regressions = run.compare(report, run.load_report(args.baseline), args.tolerance)
+        for name, metric, previous, current in regressions:
+            print(f"REGRESSION {name} {metric}: {previous} -> {current}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import csv
+import io
+import random
+from datetime import date, timedelta
+
+import config_loader
+from models import schema
+from models.database import get_connection
+
+# Docket sizes the benchmark suite is usually run at
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_TABLE = "bench_case_records"
+
+_FIRST_NAMES = ["Ram", "Sita", "Mohan", "Geeta", "Rakesh", "Sunita", "Ajay", "Pooja", "Vijay", "Anita",
+                "Suresh", "Kavita", "Arun", "Neha", "Manoj", "Rekha", "Deepak", "Shalini", "Alok", "Meena"]
+_LAST_NAMES = ["Sharma", "Verma", "Gupta", "Yadav", "Singh", "Mishra", "Tiwari", "Pandey", "Shukla",
+               "Dubey", "Srivastava", "Kumar", "Saxena", "Tripathi", "Awasthi", "Bajpai"]
+_STAGES = ["Evidence", "Arguments", "Summons", "Written Statement", "Issues", "Final Hearing", "Order"]
+_COLUMNS = [
+    "case_number", "case_title", "case_type", "location", "company_name", "upcoming_date",
+    "previous_dates", "stage", "remarks", "status", "claimant_advocate_name",
+    "claimant_advocate_mobile_number",
+]
+
+
+def _person(rng):
+    return f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}"
+
+
+def synthetic_cases(count, seed=0, years=3, today=None):
+    """Yield `count` realistic case rows (in _COLUMNS order).
+
+    Hearing dates spread over `years` of history up to a few months ahead of
+    `today`, clustered on weekdays like a real cause list; most cases are
+    open and each carries a plausible number of adjournments.
+    """
+    config = config_loader.load_config()
+    rng = random.Random(seed)
+    today = today or date.today()
+    first_day = today - timedelta(days=365 * years)
+    span = (today + timedelta(days=120) - first_day).days
+    advocates = [(_person(rng), f"9{rng.randrange(10**8, 10**9)}") for _ in range(max(50, count // 200))]
+    statuses = config.statuses
+    status_weights = [0.7] + [0.3 / (len(statuses) - 1)] * (len(statuses) - 1)
+
+    for n in range(count):
+        upcoming = first_day + timedelta(days=rng.randrange(span))
+        if upcoming.weekday() >= 5:
+            upcoming -= timedelta(days=upcoming.weekday() - 4)
+        history = set()
+        hearing = upcoming
+        for _ in range(rng.randrange(16)):
+            hearing -= timedelta(days=rng.randrange(14, 90))
+            history.add(hearing)
+        advocate_name, advocate_mobile = rng.choice(advocates)
+        yield (
+            f"{n + 1}/{upcoming.year % 100:02d}",
+            f"{_person(rng)} vs {rng.choice(config.company_names)}",
+            rng.choice(config.case_types),
+            rng.choice(config.locations),
+            rng.choice(config.company_names),
+            upcoming,
+            "{" + ",".join(str(d) for d in sorted(history)) + "}",
+            rng.choice(_STAGES),
+            "",
+            rng.choices(statuses, status_weights)[0],
+            advocate_name,
+            advocate_mobile,
+        )
+
+
+def create_bench_table(table_name=DEFAULT_TABLE):
+    """(Re)create `table_name` with the production schema and indexes."""
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {table_name}")
+        for _, _, apply in schema.MIGRATIONS:
+            apply(cur, table_name)
+
+
+def generate_docket(count, table_name=DEFAULT_TABLE, seed=0, years=3, chunk_size=50_000):
+    """Load a fresh synthetic docket of `count` cases into `table_name`."""
+    create_bench_table(table_name)
+    rows = synthetic_cases(count, seed, years)
+    column_list = ", ".join(_COLUMNS)
+    with get_connection() as conn, conn.cursor() as cur:
+        while True:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            written = 0
+            for row in rows:
+                writer.writerow(row)
+                written += 1
+                if written == chunk_size:
+                    break
+            if not written:
+                break
+            buffer.seek(0)
+            cur.copy_expert(f"COPY {table_name} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cur.execute(f"ANALYZE {table_name}")
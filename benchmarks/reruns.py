@@ -0,0 +1,49 @@
+import os
+
+from streamlit.testing.v1 import AppTest
+
+from .run import measure
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ("home", "search_case", "cases_by_date", "pending_cases")
+
+# What a widget change inside the page fragment reruns: the page alone,
+# without the sidebar, the style sheet or the schema check.
+_FRAGMENT_SCRIPT = f"""
+import sys
+sys.path.insert(0, {ROOT!r})
+from views import main_view
+main_view.render_page()
+"""
+
+
+def _app_test(scope, page):
+    if scope == "app":
+        app_test = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    else:
+        app_test = AppTest.from_string(_FRAGMENT_SCRIPT, default_timeout=60)
+    app_test.session_state.page = page
+    app_test.run()
+    if app_test.exception:
+        raise RuntimeError(f"{scope} run of {page} failed: {app_test.exception[0].message}")
+    return app_test
+
+
+def run_reruns(pages=PAGES, repeat=20):
+    """Time reruns of each page as a whole-app run and as a fragment rerun.
+
+    Uses Streamlit's AppTest against the configured database, so the figures
+    include its script-runner overhead but no browser or network.
+    """
+    results = {}
+    for page in pages:
+        for scope in ("app", "fragment"):
+            results[f"{scope}.{page}"] = measure(_app_test(scope, page).run, repeat)
+    return results
+
+
+def format_reruns(results):
+    lines = [f"{'rerun':<40}{'p50 ms':>10}{'p95 ms':>10}{'peak KiB':>12}"]
+    for name, result in results.items():
+        lines.append(f"{name:<40}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['peak_kib']:>12.1f}")
+    return "\n".join(lines)
@@ -0,0 +1,191 @@
+import gc
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+
+import config_loader
+from controllers.case_controller import CaseController
+from models import cache, search
+from models.case import Case
+from models.database import get_connection
+from models.records import records_to_frame
+from views.utils import changed_case_rows
+from .generate import DEFAULT_TABLE
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def measure(operation, repeat):
+    """Time `operation` `repeat` times, then once more under tracemalloc.
+
+    The memory pass is separate because tracemalloc slows Python code down
+    enough to distort the latency figures.
+    """
+    operation()  # warm up the pool, plan cache and imports
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        samples.append((time.perf_counter() - start) * 1000)
+    gc.collect()
+    tracemalloc.start()
+    operation()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "runs": repeat,
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(_percentile(samples, 0.95), 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+class _Fixture:
+    """Representative inputs picked from the benchmark table itself."""
+
+    def __init__(self, table_name):
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT upcoming_date FROM {table_name}
+                GROUP BY upcoming_date ORDER BY count(*) DESC LIMIT 1
+            """)
+            self.busy_date = cur.fetchone()[0]
+            cur.execute(f"SELECT id, case_number, case_title, location, claimant_advocate_name FROM {table_name} ORDER BY random() LIMIT 1")
+            self.case_id, self.case_number, self.case_title, self.location, self.advocate = cur.fetchone()
+            cur.execute(f"SELECT previous_dates[1] FROM {table_name} WHERE cardinality(previous_dates) > 0 LIMIT 1")
+            self.heard_on = cur.fetchone()[0]
+        self.company = config_loader.load_config().company_names[0]
+        self.title_word = self.case_title.split()[0]
+        # A typo in the first party name, as clerks type it during a hearing
+        self.title_typo = self.title_word[:-1] + ("a" if self.title_word[-1] != "a" else "e")
+
+
+def benchmarks(table_name, fixture):
+    """name -> zero-argument callable, covering every Case/CaseController read and write."""
+    controller = CaseController()
+    controller.table_name = table_name
+    rng = random.Random(1)
+    busy_rows = Case.get_cases_by_date(fixture.busy_date, table_name)
+    busy_frame = records_to_frame(busy_rows)
+    pending_page = Case.get_pending_cases_page(table_name, limit=50)
+    last_pending = (pending_page[-1].upcoming_date, pending_page[-1].id)
+    far_future = date.today() + timedelta(days=3650)
+
+    def reschedule_one():
+        Case.update_case_data(fixture.case_id, far_future + timedelta(days=rng.randrange(10**5)), table_name)
+
+    def save_edited_day():
+        edited = busy_frame.copy()
+        edited["Upcoming Date"] = [far_future + timedelta(days=rng.randrange(10**5)) for _ in range(len(edited))]
+        changes = changed_case_rows(busy_frame, edited)
+        controller.update_cases_batch(changes)
+
+    def add_case():
+        Case.add_case({
+            "case_number": f"B{rng.randrange(10**8)}", "case_title": "Benchmark vs Bench",
+            "case_type": "MACT", "location": fixture.location, "company_name": fixture.company,
+            "upcoming_date": far_future, "stage": "", "remarks": "", "status": "OPEN",
+            "claimant_advocate_name": fixture.advocate, "claimant_advocate_mobile_number": "9000000000",
+        }, table_name)
+
+    def update_case():
+        row = Case.search_by_case_number(fixture.case_number, table_name)[0]
+        case_data = row._asdict()
+        del case_data["id"], case_data["previous_dates"]
+        Case.update_case(row.id, case_data, table_name)
+
+    def controller_cold(read):
+        def run():
+            cache.case_cache.clear()
+            read()
+        return run
+
+    return {
+        "Case.get_cases_by_date": lambda: Case.get_cases_by_date(fixture.busy_date, table_name),
+        "Case.get_pending_cases": lambda: Case.get_pending_cases(table_name),
+        "Case.get_pending_cases_page.first": lambda: Case.get_pending_cases_page(table_name, limit=50),
+        "Case.get_pending_cases_page.next": lambda: Case.get_pending_cases_page(table_name, last_pending, 50),
+        "Case.iter_pending_cases": lambda: sum(1 for _ in Case.iter_pending_cases(table_name)),
+        "Case.case_number_exists": lambda: Case.case_number_exists(fixture.case_number, fixture.location, table_name),
+        "Case.search_by_case_number": lambda: Case.search_by_case_number(fixture.case_number, table_name),
+        "Case.search_by_case_title": lambda: Case.search_by_case_title(fixture.title_word, table_name),
+        "Case.search_by_company_name": lambda: Case.search_by_company_name(fixture.company, table_name),
+        "Case.search_by_company_name_page": lambda: Case.search_by_company_name_page(fixture.company, table_name),
+        "Case.get_case_by_number_or_title": lambda: Case.get_case_by_number_or_title(fixture.case_number, table_name),
+        "Case.get_cases_heard_on": lambda: Case.get_cases_heard_on(fixture.heard_on, table_name),
+        "Case.get_adjournment_counts": lambda: Case.get_adjournment_counts(table_name),
+        "Case.add_case": add_case,
+        "Case.update_case": update_case,
+        "Case.update_case_data": reschedule_one,
+        "search.search_cases.number": lambda: search.search_cases(fixture.case_number, table_name),
+        "search.search_cases.typo": lambda: search.search_cases(fixture.title_typo, table_name),
+        "search.search_cases.advocate": lambda: search.search_cases(fixture.advocate, table_name),
+        "CaseController.get_cases_by_date.cold": controller_cold(lambda: controller.get_cases_by_date(fixture.busy_date)),
+        "CaseController.get_cases_by_date.warm": lambda: controller.get_cases_by_date(fixture.busy_date),
+        "CaseController.get_pending_cases_page.cold": controller_cold(lambda: controller.get_pending_cases_page()),
+        "CaseController.search_case_by_company_page.cold": controller_cold(lambda: controller.search_case_by_company_page(fixture.company)),
+        "data_editor.save_day": save_edited_day,
+        "CaseView.dataframe.cause_list": lambda: records_to_frame(busy_rows),
+        "CaseView.dataframe.pending_page": lambda: records_to_frame(pending_page),
+    }
+
+
+def run_benchmarks(table_name=DEFAULT_TABLE, repeat=20, only=None):
+    fixture = _Fixture(table_name)
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(f"SELECT count(*) FROM {table_name}")
+        cases = cur.fetchone()[0]
+    results = {}
+    for name, operation in benchmarks(table_name, fixture).items():
+        if only and not any(part in name for part in only):
+            continue
+        results[name] = measure(operation, repeat)
+    return {
+        "meta": {
+            "table": table_name,
+            "cases": cases,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance=0.2):
+    """Return [(name, metric, baseline, current)] that regressed by more than `tolerance`."""
+    regressions = []
+    for name, current in report["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "peak_kib"):
+            if current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append((name, metric, previous[metric], current[metric]))
+    return regressions
+
+
+def format_report(report):
+    lines = [f"{report['meta']['cases']} cases in {report['meta']['table']}, {report['meta']['repeat']} runs each"]
+    lines.append(f"{'benchmark':<52}{'p50 ms':>10}{'p95 ms':>10}{'peak KiB':>12}")
+    for name, result in report["results"].items():
+        lines.append(f"{name:<52}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['peak_kib']:>12.1f}")
+    return "\n".join(lines)
+
+
+def save_report(report, path):
+    with open(path, "w") as out:
+        json.dump(report, out, indent=2)
+
+
+def load_report(path):
+    with open(path) as report_file:
+        return json.load(report_file)
@@ -0,0 +1,120 @@
+import argparse
+import logging
+import sys
+
+from datetime import date
+
+from models import archive, case_export, case_import, cause_list, dashboard, schema
+
+
+def migrate(args):
+    applied = schema.migrate()
+    if applied:
+        print("Applied migrations: " + ", ".join(str(version) for version in applied))
+    else:
+        print("Schema is up to date.")
+
+
+def migration_status(args):
+    pending = schema.pending_migrations()
+    if not pending:
+        print("Schema is up to date.")
+    for version, description in pending:
+        print(f"pending {version}: {description}")
+
+
+def check_indexes(args):
+    unindexed = schema.check_query_plans()
+    if unindexed:
+        print("Queries without a usable index: " + ", ".join(unindexed))
+        return 1
+    print("All hot queries can use an index.")
+
+
+def import_cases(args):
+    result = case_import.import_case_book(args.path, dry_run=args.dry_run)
+    for file_row, message in result["errors"]:
+        print(f"row {file_row}: {message}")
+    for case_number, location in result["existing"]:
+        print(f"skipped existing case {case_number} @ {location}")
+    print(f"{result['rows']} rows read, {result['valid']} valid, {len(result['errors'])} rejected, "
+          f"{result['inserted']} inserted, {len(result['existing'])} already present")
+    return 1 if result["errors"] else 0
+
+
+def export_cases(args):
+    dates = tuple(date.fromisoformat(value) for value in args.dates)
+    with open(args.output, "wb") as out:
+        case_export.export_cases(out, args.scope, args.format, dates, include_archived=args.include_archived)
+    print(f"Wrote {args.output}")
+
+
+def refresh_dashboard(args):
+    dashboard.refresh_summary()
+    print("Dashboard summary rebuilt.")
+
+
+def build_cause_list(args):
+    list_date = date.fromisoformat(args.date) if args.date else None
+    version, count = cause_list.build_snapshot(list_date)
+    print(f"Built cause list version {version} with {count} cases.")
+
+
+def archive_cases(args):
+    moved = archive.archive_closed_cases(after_days=args.after_days)
+    print(f"Archived {moved} closed cases.")
+
+
+def restore_case(args):
+    if not archive.restore_case(args.case_id):
+        print(f"No archived case with id {args.case_id}.")
+        return 1
+    print(f"Restored case {args.case_id}.")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Case Management System maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("migrate", help="apply pending schema migrations").set_defaults(handler=migrate)
+    subparsers.add_parser("migration-status", help="list pending schema migrations").set_defaults(handler=migration_status)
+    subparsers.add_parser("check-indexes", help="EXPLAIN the hot queries and report sequential scans").set_defaults(handler=check_indexes)
+
+    subparsers.add_parser("refresh-dashboard", help="recount the dashboard summary tables").set_defaults(handler=refresh_dashboard)
+
+    cause_list_parser = subparsers.add_parser("build-cause-list", help="precompute a day's cause list (default tomorrow)")
+    cause_list_parser.add_argument("date", nargs="?", help="YYYY-MM-DD")
+    cause_list_parser.set_defaults(handler=build_cause_list)
+
+    import_parser = subparsers.add_parser("import-cases", help="bulk import a CSV or Excel case book")
+    import_parser.add_argument("path", help="CSV or .xlsx file with config.json headers")
+    import_parser.add_argument("--dry-run", action="store_true", help="validate only, do not load")
+    import_parser.set_defaults(handler=import_cases)
+
+    export_parser = subparsers.add_parser("export", help="stream cases to a CSV or Parquet file")
+    export_parser.add_argument("scope", choices=sorted(case_export.EXPORT_SCOPES))
+    export_parser.add_argument("dates", nargs="*", help="YYYY-MM-DD: one for 'date', start and end for 'range'")
+    export_parser.add_argument("-o", "--output", required=True)
+    export_parser.add_argument("-f", "--format", choices=case_export.FORMATS, default="csv")
+    export_parser.add_argument("--include-archived", action="store_true", help="also export archived (closed) cases")
+    export_parser.set_defaults(handler=export_cases)
+
+    archive_parser = subparsers.add_parser("archive-cases", help="move closed cases into the archive table")
+    archive_parser.add_argument("--after-days", type=int, help="only cases unchanged for this many days (default archive.after_days)")
+    archive_parser.set_defaults(handler=archive_cases)
+
+    restore_parser = subparsers.add_parser("restore-case", help="move an archived case back to the live table")
+    restore_parser.add_argument("case_id", type=int)
+    restore_parser.set_defaults(handler=restore_case)
+
+    return parser
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
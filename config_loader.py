@@ -1,6 +1,91 @@
 import json
+import os
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Tuple
 
-def load_config(config_path="config.json"):
-    with open(config_path, 'r') as config_file:
-        config = json.load(config_file)
-    return config
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+
+# config.json lists that populate selectboxes and enum columns
+ENUM_LISTS = ("locations", "case_types", "company_names", "statuses")
+
+_EMPTY = MappingProxyType({})
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True)
+class Config:
+    """Parsed config.json. Lists are tuples and sections read-only mappings."""
+    table_name: str
+    locations: Tuple[str, ...]
+    case_types: Tuple[str, ...]
+    company_names: Tuple[str, ...]
+    statuses: Tuple[str, ...]
+    headers: Tuple[str, ...]
+    # The headers case lists show; full records are shown by Update Case
+    list_headers: Tuple[str, ...]
+    editable_headers: Tuple[str, ...]
+    # Remaining top-level objects, e.g. "pool", "cache", "instrumentation"
+    sections: Mapping[str, Mapping]
+    # ENUM_LISTS name -> {value: position}, for selectbox indexes
+    positions: Mapping[str, Mapping[str, int]]
+
+    @classmethod
+    def from_dict(cls, raw):
+        frozen = _freeze(raw)
+        return cls(
+            table_name=frozen["table_name"],
+            locations=frozen["locations"],
+            case_types=frozen["case_types"],
+            company_names=frozen["company_names"],
+            statuses=frozen["statuses"],
+            headers=frozen["headers"],
+            list_headers=frozen.get("listHeaders", frozen["headers"]),
+            editable_headers=frozen["editableHeaders"],
+            sections=MappingProxyType({key: value for key, value in frozen.items() if isinstance(value, Mapping)}),
+            positions=MappingProxyType({
+                name: MappingProxyType({value: index for index, value in enumerate(frozen[name])})
+                for name in ENUM_LISTS
+            }),
+        )
+
+    @property
+    def open_status(self):
+        # New cases start with the first status, and only it counts as open
+        return self.statuses[0]
+
+    def section(self, name):
+        return self.sections.get(name, _EMPTY)
+
+    def index_of(self, list_name, value, default=0):
+        """Position of `value` in an ENUM_LISTS list, or `default` if it is not listed."""
+        return self.positions[list_name].get(value, default)
+
+
+_loaded = {}  # path -> ((mtime_ns, size), Config)
+_load_lock = threading.Lock()
+
+
+def load_config(config_path=DEFAULT_CONFIG_PATH):
+    """Return the Config for `config_path`, parsing the file only when it has changed."""
+    stat = os.stat(config_path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _loaded.get(config_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    with _load_lock:
+        cached = _loaded.get(config_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        with open(config_path, 'r') as config_file:
+            config = Config.from_dict(json.load(config_file))
+        _loaded[config_path] = (signature, config)
+        return config
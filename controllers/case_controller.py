@@ -1,36 +1,125 @@
-from models.case import Case
+from datetime import date, timedelta
+from models import cache, case_index, search, storage
 
 class CaseController:
     def __init__(self):
         self.table_name = "case_records"
+        self.backend = storage.get_backend()
+        self.cases = self.backend.cases
 
-    def search_case(self, search_criteria, search_query):
-        if search_criteria == "Case Number":
-            return Case.search_by_case_number(search_query, self.table_name)
-        else:
-            return Case.search_by_case_title(search_query, self.table_name)
+    def search_case(self, search_criteria, search_query, include_archived=False):
+        # "Any" (or an unknown criterion) searches every field
+        fields = (search_criteria,) if search_criteria in search.SEARCH_FIELDS else search.SEARCH_FIELDS
+        return self.backend.search_cases(search_query, self.table_name, fields, include_archived=include_archived)
 
-    def add_new_case(self, case_data, location):
-        # Implement the logic to add a new case
-        return Case.case_number_exists(case_data, location, self.table_name)
+    def suggest_cases(self, query, fields=tuple(case_index.INDEXED_FIELDS), limit=case_index.DEFAULT_LIMIT):
+        # (id, label) pairs answered from the in-process index, without a query
+        return case_index.get_index(self.backend, self.table_name).suggest(query, fields, limit)
 
-    def update_cases(self, case_id, new_upcoming_date):
-        Case.update_case_data(case_id, new_upcoming_date, self.table_name)
+    def case_labels(self):
+        # Every (id, label) in the index, for pickers that filter in the browser
+        return case_index.get_index(self.backend, self.table_name).labels()
+
+    def get_cases_by_ids(self, case_ids):
+        return self.cases.get_cases_by_ids(case_ids, self.table_name)
+
+    def _index_saved(self, rows):
+        rows = [row for row in rows if row is not None]
+        if rows:
+            case_index.get_index(self.backend, self.table_name).apply(rows)
+
+    def add_new_case(self, case_data):
+        # Returns the new row, or None if the case number exists at that location
+        row = self.cases.add_case(case_data, self.table_name)
+        self._index_saved([row])
+        return row
+
+    def update_cases(self, case_id, new_upcoming_date, expected_version=None):
+        message, row = self.cases.update_case_data(case_id, new_upcoming_date, self.table_name, expected_version)
+        self._index_saved([row])
+        return message, row
+
+    def update_cases_batch(self, changes):
+        outcomes = self.cases.update_cases_batch(changes, self.table_name)
+        self._index_saved([row for _, row in outcomes.values()])
+        return outcomes
 
     def get_todays_cases(self):
-        return Case.get_todays_case_list(self.table_name)
+        date_key = cache.date_key(date.today())
+        return cache.cached(
+            ("todays_cases", self.table_name, date_key),
+            {(cache.DATE, date_key)},
+            lambda: self.cases.get_todays_case_list(self.table_name)
+        )
 
     def get_cases_by_date(self, selected_date):
-        return Case.get_cases_by_date(selected_date, self.table_name)
+        date_key = cache.date_key(selected_date)
+        return cache.cached(
+            ("cases_by_date", self.table_name, date_key),
+            {(cache.DATE, date_key)},
+            lambda: self.cases.get_cases_by_date(selected_date, self.table_name)
+        )
+
+    def get_cases_between(self, start_date, end_date):
+        date_keys = [
+            cache.date_key(start_date + timedelta(days=offset))
+            for offset in range((end_date - start_date).days + 1)
+        ]
+        return cache.cached(
+            ("cases_between", self.table_name, date_keys[0], date_keys[-1]),
+            {(cache.DATE, key) for key in date_keys},
+            lambda: self.cases.get_cases_between(start_date, end_date, self.table_name)
+        )
+
+    def get_cases_heard_on(self, hearing_date):
+        return self.cases.get_cases_heard_on(hearing_date, self.table_name)
+
+    def get_adjournment_counts(self):
+        return self.cases.get_adjournment_counts(self.table_name)
 
     def get_pending_cases(self):
-        return Case.get_pending_cases(self.table_name)
+        return cache.cached(
+            ("pending", self.table_name, date.today()),
+            {(cache.PENDING,)},
+            lambda: self.cases.get_pending_cases(self.table_name)
+        )
+
+    def get_pending_cases_page(self, after=None, limit=50):
+        return cache.cached(
+            ("pending_page", self.table_name, date.today(), after, limit),
+            {(cache.PENDING,)},
+            lambda: self.cases.get_pending_cases_page(self.table_name, after, limit)
+        )
+
+    def iter_pending_cases(self, batch_size=1000):
+        return self.cases.iter_pending_cases(self.table_name, batch_size)
 
     def search_case_by_company(self,company_name):
-        return Case.search_by_company_name(company_name, self.table_name)
+        return cache.cached(
+            ("company", self.table_name, company_name),
+            {(cache.COMPANY, company_name)},
+            lambda: self.cases.search_by_company_name(company_name, self.table_name)
+        )
+
+    def search_case_by_company_page(self, company_name, after_id=None, limit=50):
+        return cache.cached(
+            ("company_page", self.table_name, company_name, after_id, limit),
+            {(cache.COMPANY, company_name)},
+            lambda: self.cases.search_by_company_name_page(company_name, self.table_name, after_id, limit)
+        )
     
     def get_case_by_number_or_title(self, search_query):
-        return Case.get_case_by_number_or_title(search_query, self.table_name)
+        matches = self.backend.search_cases(search_query, self.table_name, (search.CASE_NUMBER, search.CASE_TITLE), limit=1)
+        return matches[0] if matches else None
+
+    def find_cases_by_number_or_title(self, search_query, limit=search.DEFAULT_LIMIT):
+        return self.backend.search_cases(search_query, self.table_name, (search.CASE_NUMBER, search.CASE_TITLE), limit)
+
+    def update_case(self, case_id, case_data, expected_version=None):
+        message, row = self.cases.update_case(case_id, case_data, self.table_name, expected_version)
+        self._index_saved([row])
+        return message, row
 
-    def update_case(self, case_id, case_data):
-        return Case.update_case(case_id, case_data, self.table_name)
\ No newline at end of file
+    def get_dashboard(self):
+        # Independent panels, fetched concurrently
+        return self.backend.fetch_all(("counts", "hearing_load", "overdue", "pending_count"), self.table_name)
@@ -0,0 +1,81 @@
+from datetime import date
+
+import config_loader
+from . import cache
+from .database import get_connection
+from .records import CASE_SELECT
+
+# Listed explicitly: the archive has archived_at before columns added later
+_MOVED_COLUMNS = f"{CASE_SELECT}, updated_at"
+
+
+def _settings():
+    settings = {"after_days": 7}
+    settings.update(config_loader.load_config().section("archive"))
+    return settings
+
+
+def closed_statuses():
+    # Every status except the open one ends a case
+    return list(config_loader.load_config().statuses[1:])
+
+
+def cases_source(table_name, include_archived=False):
+    """FROM-clause source for case rows, optionally including the archive."""
+    if not include_archived:
+        return table_name
+    return f"(SELECT {CASE_SELECT} FROM {table_name} UNION ALL SELECT {CASE_SELECT} FROM {table_name}_archive)"
+
+
+def archive_closed_cases(table_name="case_records", after_days=None):
+    """Move cases closed more than `after_days` ago into the archive table.
+
+    The grace period leaves a mis-keyed status visible for correction
+    before the case leaves the live lists. Returns the number moved.
+    """
+    after_days = _settings()["after_days"] if after_days is None else after_days
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            WITH moved AS (
+                DELETE FROM {table_name}
+                WHERE status = ANY(%s) AND updated_at < now() - %s * interval '1 day'
+                RETURNING {_MOVED_COLUMNS}
+            )
+            INSERT INTO {table_name}_archive ({_MOVED_COLUMNS}, archived_at)
+            SELECT {_MOVED_COLUMNS}, now() FROM moved
+            RETURNING id, upcoming_date, company_name
+        """, (closed_statuses(), after_days))
+        moved = cur.fetchall()
+        if not moved:
+            return 0
+        # Precomputed cause lists still hold the moved cases
+        cur.execute(f"""
+            UPDATE {table_name}_cause_lists SET cases = (
+                SELECT COALESCE(jsonb_agg(entry ORDER BY position), '[]')
+                FROM jsonb_array_elements(cases) WITH ORDINALITY AS e(entry, position)
+                WHERE (entry->>0)::int <> ALL(%s)
+            )
+            WHERE list_date >= %s
+        """, ([case_id for case_id, _, _ in moved], date.today()))
+        tags = cache.publish_case_changes(cur, [((upcoming_date, company_name), None) for _, upcoming_date, company_name in moved])
+    cache.case_cache.invalidate(tags)
+    return len(moved)
+
+
+def restore_case(case_id, table_name="case_records"):
+    """Move an archived case back into the live table, e.g. after a status correction."""
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            WITH restored AS (
+                DELETE FROM {table_name}_archive WHERE id = %s RETURNING {CASE_SELECT}
+            )
+            INSERT INTO {table_name} ({CASE_SELECT})
+            SELECT {CASE_SELECT} FROM restored
+            RETURNING upcoming_date, company_name
+        """, (case_id,))
+        row = cur.fetchone()
+        tags = set()
+        if row is not None:
+            tags = cache.publish_case_changes(cur, [(None, tuple(row))])
+    cache.case_cache.invalidate(tags)
+    return row is not None
@@ -0,0 +1,145 @@
+import asyncio
+import contextvars
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import streamlit as st
+
+import config_loader
+from . import dashboard, instrumentation
+from .case import Case
+from .records import CASE_SELECT, CaseRecord
+
+try:
+    import asyncpg
+except ImportError:  # optional; independent reads then run on a thread pool
+    asyncpg = None
+
+
+def _settings():
+    settings = {"enabled": True, "max_connections": 5}
+    settings.update(config_loader.load_config().section("async"))
+    return settings
+
+
+# The async pool lives on one event loop thread per process; Streamlit script
+# threads hand it coroutines and block on the combined result.
+_loop = None
+_loop_lock = threading.Lock()
+_async_pool = None
+_async_pool_lock = asyncio.Lock()
+_executor = None
+
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-queries", daemon=True).start()
+    return _loop
+
+
+async def _get_async_pool():
+    global _async_pool
+    async with _async_pool_lock:
+        if _async_pool is None:
+            database = st.secrets["database"]
+            _async_pool = await asyncpg.create_pool(
+                host=database["host"],
+                port=int(database["port"]),
+                database=database["database"],
+                user=database["user"],
+                password=database["password"],
+                min_size=1,
+                max_size=_settings()["max_connections"],
+            )
+    return _async_pool
+
+
+def _numbered(sql):
+    # psycopg2 %s placeholders -> asyncpg $1, $2, ...
+    counter = iter(range(1, sql.count("%s") + 1))
+    return re.sub(r"%s", lambda _: f"${next(counter)}", sql)
+
+
+async def _fetch(name, sql, *args):
+    pool = await _get_async_pool()
+    start = time.perf_counter()
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(_numbered(sql), *args)
+    if instrumentation.enabled:
+        instrumentation.record_query(name, sql, len(rows), (time.perf_counter() - start) * 1000, 0.0)
+    return [tuple(row) for row in rows]
+
+
+async def _counts(table_name):
+    return dashboard.group_counts(await _fetch("async_queries.counts", dashboard.COUNTS_QUERY.format(table=table_name)))
+
+
+async def _hearing_load(table_name):
+    return await _fetch(
+        "async_queries.hearing_load", dashboard.HEARING_LOAD_QUERY.format(table=table_name), *dashboard.hearing_load_params()
+    )
+
+
+async def _overdue(table_name):
+    rows = await _fetch("async_queries.overdue", dashboard.OVERDUE_QUERY.format(table=table_name), date.today())
+    return rows[0][0]
+
+
+async def _todays_cases(table_name):
+    rows = await _fetch(
+        "async_queries.todays_cases",
+        f"SELECT {CASE_SELECT} FROM {table_name} WHERE upcoming_date = %s",
+        date.today()
+    )
+    return [CaseRecord._make(row) for row in rows]
+
+
+async def _pending_count(table_name):
+    rows = await _fetch(
+        "async_queries.pending_count", f"SELECT count(*) FROM {table_name} WHERE upcoming_date <= %s", date.today()
+    )
+    return rows[0][0]
+
+
+# name -> (async query, blocking equivalent), each called with the table name
+QUERIES = {
+    "counts": (_counts, dashboard.get_counts),
+    "hearing_load": (_hearing_load, dashboard.get_hearing_load),
+    "overdue": (_overdue, dashboard.get_overdue_count),
+    "todays_cases": (_todays_cases, lambda table_name: Case.get_cases_by_date(date.today(), table_name)),
+    "pending_count": (_pending_count, Case.count_pending_cases),
+}
+
+
+async def _gather(names, table_name):
+    results = await asyncio.gather(*(QUERIES[name][0](table_name) for name in names))
+    return dict(zip(names, results))
+
+
+def fetch_all(names, table_name="case_records"):
+    """Run the named QUERIES concurrently and return {name: result}.
+
+    Uses asyncpg when it is installed, otherwise the blocking versions on a
+    thread pool, so a page with several panels waits for the slowest read
+    rather than the sum of them.
+    """
+    names = list(names)
+    if asyncpg is not None and _settings()["enabled"]:
+        return asyncio.run_coroutine_threadsafe(_gather(names, table_name), _get_loop()).result()
+
+    global _executor
+    with _loop_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(_settings()["max_connections"], thread_name_prefix="async-queries")
+    # Copy the context so instrumentation still charges the queries to this page
+    futures = {
+        name: _executor.submit(contextvars.copy_context().run, QUERIES[name][1], table_name)
+        for name in names
+    }
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,188 @@
+import json
+import logging
+import select
+import threading
+import time
+from datetime import date
+
+import config_loader
+from .database import open_dedicated_connection
+
+logger = logging.getLogger(__name__)
+
+# Tag kinds. Every cached read is tagged with what it depends on so a write
+# only drops the entries it can actually have changed.
+DATE = "date"
+COMPANY = "company"
+PENDING = "pending"
+
+
+def date_key(value):
+    if value is None:
+        return None
+    if hasattr(value, "isoformat"):
+        return value.isoformat()[:10]
+    return str(value)[:10]
+
+
+class QueryCache:
+    """Process-wide read-through cache shared by every Streamlit session."""
+
+    def __init__(self, ttl_seconds=300):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (expires_at, tags, rows)
+        self._keys_by_tag = {}  # tag -> {key}
+        # Bumped on every invalidation; a load that overlapped one is not stored
+        self._generation = 0
+
+    def get_or_load(self, key, tags, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[2]
+            generation = self._generation
+        # Load outside the lock so one slow query does not block other readers
+        rows = tuple(loader())
+        with self._lock:
+            if generation != self._generation:
+                return rows
+            self._entries[key] = (now + self.ttl_seconds, tags, rows)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+        return rows
+
+    def _matching_tags(self, tag):
+        if tag[0] != COMPANY:
+            return [tag]
+        # Company lookups are ILIKE '%query%', so a write to a company hits every
+        # cached lookup whose query is a substring of that company's name.
+        written = tag[1].lower()
+        return [cached for cached in self._keys_by_tag if cached[0] == COMPANY and cached[1].lower() in written]
+
+    def invalidate(self, tags):
+        with self._lock:
+            self._generation += 1
+            for tag in [matched for tag in tags for matched in self._matching_tags(tag)]:
+                for key in self._keys_by_tag.pop(tag, ()):
+                    entry = self._entries.pop(key, None)
+                    if entry is None:
+                        continue
+                    for other in entry[1]:
+                        if other != tag:
+                            self._keys_by_tag.get(other, set()).discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+
+def _settings():
+    settings = {"enabled": True, "ttl_seconds": 300, "notify_channel": None}
+    settings.update(config_loader.load_config().section("cache"))
+    return settings
+
+
+case_cache = QueryCache(_settings()["ttl_seconds"])
+
+
+def cached(key, tags, loader):
+    if not _settings()["enabled"]:
+        return loader()
+    _ensure_listener()
+    return case_cache.get_or_load(key, tags, loader)
+
+
+def tags_for_change(before, after):
+    """Tags affected by a case moving from `before` to `after`.
+
+    Both are (upcoming_date, company_name) tuples, or None for a case that
+    did not exist before / was not changed.
+    """
+    today = date.today()
+    tags = set()
+    for state in (before, after):
+        if state is None:
+            continue
+        upcoming_date, company_name = state
+        if upcoming_date is not None:
+            tags.add((DATE, date_key(upcoming_date)))
+            if date_key(upcoming_date) <= today.isoformat():
+                tags.add((PENDING,))
+        if company_name:
+            tags.add((COMPANY, company_name))
+    return tags
+
+
+def publish_case_changes(cur, changes):
+    """Work out the cache tags hit by [(before, after)] case changes.
+
+    Call with the writing transaction's cursor: when a notify channel is
+    configured the tags are published on it, so other app replicas only see
+    them once the write commits. Pass the returned tags to
+    case_cache.invalidate() after the commit.
+    """
+    tags = set()
+    for before, after in changes:
+        tags |= tags_for_change(before, after)
+    channel = _settings()["notify_channel"]
+    if tags and channel:
+        cur.execute("SELECT pg_notify(%s, %s)", (channel, json.dumps(sorted(tags))))
+    return tags
+
+
+_listener_lock = threading.Lock()
+_listener = None
+
+
+# Seconds between listener reconnect attempts, doubling up to the maximum
+LISTEN_RETRY_SECONDS = 1
+LISTEN_RETRY_MAX_SECONDS = 60
+
+
+def _listen(channel):
+    delay = LISTEN_RETRY_SECONDS
+    while True:
+        conn, listening_since = None, None
+        try:
+            conn = open_dedicated_connection()
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f'LISTEN "{channel}"')
+            listening_since = time.monotonic()
+            # Anything cached before we started listening may have missed a notification
+            case_cache.clear()
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    case_cache.invalidate(tuple(tag) for tag in json.loads(notify.payload))
+        except Exception:
+            # A connection that stayed up a while starts the backoff over
+            if listening_since is not None and time.monotonic() - listening_since >= LISTEN_RETRY_MAX_SECONDS:
+                delay = LISTEN_RETRY_SECONDS
+            logger.exception("Cache invalidation listener failed; reconnecting in %s s", delay)
+            case_cache.clear()
+        finally:
+            if conn is not None and not conn.closed:
+                conn.close()
+        time.sleep(delay)
+        delay = min(delay * 2, LISTEN_RETRY_MAX_SECONDS)
+
+
+def _ensure_listener():
+    global _listener
+    if _listener is not None:
+        return
+    channel = _settings()["notify_channel"]
+    if not channel:
+        return
+    with _listener_lock:
+        if _listener is None:
+            _listener = threading.Thread(target=_listen, args=(channel,), name="case-cache-listener", daemon=True)
+            _listener.start()
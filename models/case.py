@@ -1,28 +1,56 @@
 from .database import get_connection
+from . import cache, cause_list
+from .records import CASE_SELECT, CaseRecord, case_select, fetch_record, fetch_records
 from datetime import date
+from psycopg2.extras import execute_values
 
 class Case:
 
+    # previous_dates with the current upcoming_date appended (once)
+    _ROLLED_HISTORY = """
+        CASE WHEN c.upcoming_date IS NULL OR c.upcoming_date = ANY(c.previous_dates)
+             THEN c.previous_dates
+             ELSE array_append(c.previous_dates, c.upcoming_date)
+        END
+    """
+
+    _UPDATE_MESSAGES = {
+        "updated": "Case updated successfully.",
+        "not_found": "Case not found.",
+        "date_in_history": "The upcoming date is already present in the previous dates list.",
+        "stale": "The case was changed by someone else since it was loaded; reload it and try again.",
+    }
+
     @staticmethod
-    def add_case(case_data):
-        conn = get_connection()
-        cur = conn.cursor()
-        insert_query = """
-            INSERT INTO case_records (
-                case_number, case_title, case_type, location, company_name, 
-                upcoming_date, stage, remarks, status, 
+    def add_case(case_data, table_name="case_records"):
+        """Insert a case unless its case number already exists at that location.
+
+        The (case_number, location) unique constraint decides atomically, so
+        concurrent submissions of the same case cannot both succeed. Returns
+        the inserted row, or None for a duplicate.
+        """
+        insert_query = f"""
+            INSERT INTO {table_name} (
+                case_number, case_title, case_type, location, company_name,
+                upcoming_date, stage, remarks, status,
                 claimant_advocate_name, claimant_advocate_mobile_number
             ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (case_number, location) DO NOTHING
+            RETURNING {CASE_SELECT}
         """
         parameters = (
-            case_data["case_number"], case_data["case_title"], case_data["case_type"], case_data["location"], 
-            case_data["company_name"], case_data["upcoming_date"], case_data["stage"], case_data["remarks"], 
+            case_data["case_number"], case_data["case_title"], case_data["case_type"], case_data["location"],
+            case_data["company_name"], case_data["upcoming_date"], case_data["stage"], case_data["remarks"],
             case_data["status"], case_data["claimant_advocate_name"], case_data["claimant_advocate_mobile_number"]
         )
-        cur.execute(insert_query, parameters)
-        conn.commit()
-        cur.close()
-        conn.close()
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(insert_query, parameters)
+            row = fetch_record(cur)
+            tags = set()
+            if row is not None:
+                tags = cache.publish_case_changes(cur, [(None, (case_data["upcoming_date"], case_data["company_name"]))])
+        cache.case_cache.invalidate(tags)
+        return row
 
     # @staticmethod
     # def case_number_exists(case_number, location, table_name):
@@ -36,35 +64,31 @@ class Case:
 
     @staticmethod
     def case_number_exists(case_number, location, table_name):
-        conn = get_connection()
-        cur = conn.cursor()
-        # Safely include table_name using f-string and use parameterized query for other variables
-        cur.execute(f"SELECT 1 FROM {table_name} WHERE case_number = %s AND location = %s", (case_number, location))
-        exists = cur.fetchone() is not None
-        cur.close()
-        conn.close()
-        return exists
+        with get_connection() as conn, conn.cursor() as cur:
+            # Safely include table_name using f-string and use parameterized query for other variables
+            cur.execute(f"SELECT 1 FROM {table_name} WHERE case_number = %s AND location = %s", (case_number, location))
+            return cur.fetchone() is not None
 
 
     @staticmethod
     def search_by_case_number(case_number, table_name):
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute(f"SELECT * FROM {table_name} WHERE case_number = %s", (case_number,))
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
-        return rows
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(f"SELECT {CASE_SELECT} FROM {table_name} WHERE case_number = %s", (case_number,))
+            return fetch_records(cur)
+
+    @staticmethod
+    def get_cases_by_ids(case_ids, table_name):
+        """The rows with these ids, in the order given; missing ids are skipped."""
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(f"SELECT {CASE_SELECT} FROM {table_name} WHERE id = ANY(%s)", (list(case_ids),))
+            by_id = {case.id: case for case in fetch_records(cur)}
+        return [by_id[case_id] for case_id in case_ids if case_id in by_id]
 
     @staticmethod
     def search_by_case_title(case_title, table_name):
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute(f"SELECT * FROM {table_name} WHERE case_title ILIKE %s", ('%' + case_title + '%',))
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
-        return rows
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(f"SELECT {CASE_SELECT} FROM {table_name} WHERE case_title ILIKE %s", ('%' + case_title + '%',))
+            return fetch_records(cur)
 
     # @staticmethod
     # def case_number_exists(case_number, location, table_name):
@@ -78,83 +102,147 @@ class Case:
 
     @staticmethod
     def get_cases_by_date(selected_date, table_name):
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute(f"SELECT * FROM {table_name} WHERE upcoming_date = %s", (selected_date,))
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
-        return rows
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(f"SELECT {CASE_SELECT} FROM {table_name} WHERE upcoming_date = %s", (selected_date,))
+            return fetch_records(cur)
+
+    @staticmethod
+    def get_cases_between(start_date, end_date, table_name):
+        """Cases with an upcoming date in [start_date, end_date], in date order."""
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                f"SELECT {CASE_SELECT} FROM {table_name} WHERE upcoming_date BETWEEN %s AND %s ORDER BY upcoming_date, id",
+                (start_date, end_date)
+            )
+            return fetch_records(cur)
+
+    @staticmethod
+    def get_cases_heard_on(hearing_date, table_name):
+        with get_connection() as conn, conn.cursor() as cur:
+            # @> (rather than = ANY) lets the GIN index on previous_dates serve this
+            cur.execute(f"SELECT {CASE_SELECT} FROM {table_name} WHERE previous_dates @> ARRAY[%s::date]", (hearing_date,))
+            return fetch_records(cur)
+
+    @staticmethod
+    def get_adjournment_counts(table_name):
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT id, case_number, cardinality(previous_dates) AS adjournments
+                FROM {table_name}
+                ORDER BY adjournments DESC
+            """)
+            return cur.fetchall()
 
     @staticmethod
     def get_todays_case_list(table_name):
+        # Served from the cause list built the evening before when there is one
         today = date.today()
+        snapshot = cause_list.get_cause_list(today, table_name)
+        if snapshot is not None:
+            return snapshot[0]
         return Case.get_cases_by_date(today, table_name)
 
     @staticmethod
     def get_pending_cases(table_name):
         today = date.today()
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute(f"SELECT * FROM {table_name} WHERE upcoming_date <= %s", (today,))
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
-        return rows
-
-    @staticmethod
-    def update_case_data(case_id, upcoming_date, table_name):
-        conn = get_connection()  # Assuming get_connection() is defined to connect to your PostgreSQL DB
-        cur = conn.cursor()
-
-        # Fetch the existing upcoming_date and previous_dates
-        fetch_query = f"""
-                SELECT upcoming_date, previous_dates
-                FROM {table_name}
-                WHERE id = %s
-            """
-        cur.execute(fetch_query, (case_id,))
-        result = cur.fetchone()
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(f"SELECT {CASE_SELECT} FROM {table_name} WHERE upcoming_date <= %s", (today,))
+            return fetch_records(cur)
+
+    @staticmethod
+    def count_pending_cases(table_name):
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(f"SELECT count(*) FROM {table_name} WHERE upcoming_date <= %s", (date.today(),))
+            return cur.fetchone()[0]
 
-        if result is not None:
-            current_upcoming_date, previous_dates = result
+    @staticmethod
+    def get_pending_cases_page(table_name, after=None, limit=50):
+        """One page of pending cases ordered by (upcoming_date, id).
 
-            # Convert previous_dates to a list
-            if previous_dates:
-                previous_dates_list = previous_dates.split(", ")
+        `after` is the (upcoming_date, id) of the last row of the previous
+        page, so every page is an index range scan however deep it is.
+        """
+        today = date.today()
+        with get_connection() as conn, conn.cursor() as cur:
+            if after is None:
+                cur.execute(f"""
+                    SELECT {CASE_SELECT} FROM {table_name}
+                    WHERE upcoming_date <= %s
+                    ORDER BY upcoming_date, id
+                    LIMIT %s
+                """, (today, limit))
             else:
-                previous_dates_list = []
-
-            # Check if the upcoming date is in the previous dates list
-            if str(current_upcoming_date) not in previous_dates_list:
-                previous_dates_list.append(str(current_upcoming_date))
-
-            # Check if the new upcoming date is not already in the previous dates list
-            if str(upcoming_date) in previous_dates_list:
-                return "The upcoming date is already present in the previous dates list."
-
-            # Update the previous_dates and upcoming_date columns
-            update_query = f"""
-                    UPDATE {table_name} SET
-                        upcoming_date = %s,
-                        previous_dates = %s
-                    WHERE id = %s
-                """
-            cur.execute(update_query, (
-                upcoming_date,
-                ", ".join(previous_dates_list),
-                case_id
-            ))
-
-            conn.commit()
-            cur.close()
-            conn.close()
-
-            return "Case updated successfully."
-        else:
-            cur.close()
-            conn.close()
-            return "Case not found."
+                cur.execute(f"""
+                    SELECT {CASE_SELECT} FROM {table_name}
+                    WHERE upcoming_date <= %s AND (upcoming_date, id) > (%s, %s)
+                    ORDER BY upcoming_date, id
+                    LIMIT %s
+                """, (today, after[0], after[1], limit))
+            return fetch_records(cur)
+
+    @staticmethod
+    def iter_pending_cases(table_name, batch_size=1000):
+        """Stream every pending case through a server-side cursor.
+
+        Rows arrive `batch_size` at a time, so memory stays flat however
+        many cases are pending. The pooled connection is held until the
+        generator is exhausted or closed.
+        """
+        today = date.today()
+        with get_connection() as conn:
+            with conn.cursor(name="pending_cases_stream") as cur:
+                cur.itersize = batch_size
+                cur.execute(f"""
+                    SELECT {CASE_SELECT} FROM {table_name}
+                    WHERE upcoming_date <= %s
+                    ORDER BY upcoming_date, id
+                """, (today,))
+                for row in cur:
+                    yield CaseRecord._make(row)
+
+    @staticmethod
+    def update_case_data(case_id, upcoming_date, table_name, expected_version=None):
+        """Reschedule a case, rolling its current date into previous_dates.
+
+        One statement: prev locks the row, so the outcome is judged against
+        the latest committed version. With `expected_version` the update
+        only applies if nobody changed the case since that version was read.
+        Returns (message, updated row or None).
+        """
+        roll_forward_query = f"""
+            WITH prev AS (
+                SELECT id, upcoming_date, company_name, version FROM {table_name}
+                WHERE id = %(case_id)s
+                FOR UPDATE
+            ), updated AS (
+                UPDATE {table_name} AS c SET
+                    previous_dates = {Case._ROLLED_HISTORY},
+                    upcoming_date = %(upcoming_date)s
+                FROM prev
+                WHERE c.id = prev.id
+                  AND (%(version)s::int IS NULL OR prev.version = %(version)s::int)
+                  AND %(upcoming_date)s::date IS DISTINCT FROM c.upcoming_date
+                  AND NOT (%(upcoming_date)s::date = ANY(c.previous_dates))
+                RETURNING {case_select("c")}
+            )
+            SELECT CASE WHEN updated.id IS NOT NULL THEN 'updated'
+                        WHEN prev.id IS NULL THEN 'not_found'
+                        WHEN prev.version <> %(version)s::int THEN 'stale'
+                        ELSE 'date_in_history'
+                   END,
+                   prev.upcoming_date, prev.company_name, {case_select("updated")}
+            FROM (SELECT 1) AS one
+            LEFT JOIN prev ON true
+            LEFT JOIN updated ON true
+        """
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(roll_forward_query, {"case_id": case_id, "upcoming_date": upcoming_date, "version": expected_version})
+            outcome, previous_date, company_name, *row = cur.fetchone()
+            tags = set()
+            if outcome == "updated":
+                tags = cache.publish_case_changes(cur, [((previous_date, company_name), (upcoming_date, company_name))])
+        cache.case_cache.invalidate(tags)
+        return Case._UPDATE_MESSAGES[outcome], CaseRecord._make(row) if outcome == "updated" else None
         # conn = get_connection()
         # cur = conn.cursor()
         # for _, row in case_data.iterrows():
@@ -185,44 +273,134 @@ class Case:
         # cur.close()
         # conn.close()
 
+    @staticmethod
+    def update_cases_batch(changes, table_name):
+        """Apply (case_id, upcoming_date, stage, version) edits in one statement.
+
+        Date changes roll the current date into previous_dates exactly like
+        update_case_data; a row whose new date is already in its history, or
+        whose version is no longer the one the edit was made against, is left
+        untouched (a None version skips that check). prev locks the rows, so
+        outcomes are judged against the latest committed versions. Returns
+        {case_id: (outcome message, updated row or None)} for every change.
+        """
+        if not changes:
+            return {}
+        batch_query = f"""
+            WITH changes (id, upcoming_date, stage, version) AS (VALUES %s),
+            prev AS (
+                SELECT id, upcoming_date, company_name, version FROM {table_name}
+                WHERE id IN (SELECT id FROM changes)
+                FOR UPDATE
+            ), updated AS (
+                UPDATE {table_name} AS c SET
+                    previous_dates = CASE
+                        WHEN changes.upcoming_date IS DISTINCT FROM c.upcoming_date
+                        THEN {Case._ROLLED_HISTORY}
+                        ELSE c.previous_dates
+                    END,
+                    upcoming_date = changes.upcoming_date,
+                    stage = changes.stage
+                FROM changes JOIN prev USING (id)
+                WHERE c.id = changes.id
+                  AND (changes.version IS NULL OR prev.version = changes.version)
+                  AND (changes.upcoming_date IS NOT DISTINCT FROM c.upcoming_date
+                       OR NOT (changes.upcoming_date = ANY(c.previous_dates)))
+                RETURNING {case_select("c")}
+            )
+            SELECT changes.id,
+                   CASE WHEN updated.id IS NOT NULL THEN 'updated'
+                        WHEN prev.id IS NULL THEN 'not_found'
+                        WHEN prev.version <> changes.version THEN 'stale'
+                        ELSE 'date_in_history'
+                   END,
+                   prev.upcoming_date, changes.upcoming_date, prev.company_name, {case_select("updated")}
+            FROM changes
+            LEFT JOIN updated ON updated.id = changes.id
+            LEFT JOIN prev ON prev.id = changes.id
+        """
+        with get_connection() as conn, conn.cursor() as cur:
+            # page_size covers the whole batch so it is sent as a single statement
+            results = execute_values(
+                cur, batch_query, changes,
+                template="(%s, %s::date, %s::text, %s::int)", page_size=len(changes), fetch=True
+            )
+            # prev holds the locked rows as they were before the UPDATE, so
+            # prev.upcoming_date is the date each case moved away from.
+            tags = cache.publish_case_changes(cur, [
+                ((previous_date, company_name), (new_date, company_name))
+                for _, outcome, previous_date, new_date, company_name, *_ in results
+                if outcome == "updated"
+            ])
+        cache.case_cache.invalidate(tags)
+        return {
+            case_id: (Case._UPDATE_MESSAGES[outcome], CaseRecord._make(row) if outcome == "updated" else None)
+            for case_id, outcome, _, _, _, *row in results
+        }
+
     def search_by_company_name(company_name, table_name):
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute(f"SELECT * FROM {table_name} WHERE company_name ILIKE %s", ('%' + company_name + '%',))
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
-        return rows
-    
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(f"SELECT {CASE_SELECT} FROM {table_name} WHERE company_name ILIKE %s", ('%' + company_name + '%',))
+            return fetch_records(cur)
+
+    @staticmethod
+    def search_by_company_name_page(company_name, table_name, after_id=None, limit=50):
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT {CASE_SELECT} FROM {table_name}
+                WHERE company_name ILIKE %s AND id > %s
+                ORDER BY id
+                LIMIT %s
+            """, ('%' + company_name + '%', after_id or 0, limit))
+            return fetch_records(cur)
+
     @staticmethod
     def get_case_by_number_or_title(search_query, table_name):
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute(f"SELECT * FROM {table_name} WHERE case_number = %s OR case_title ILIKE %s", (search_query, f"%{search_query}%"))
-        row = cur.fetchone()
-        cur.close()
-        conn.close()
-        return row
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(f"SELECT {CASE_SELECT} FROM {table_name} WHERE case_number = %s OR case_title ILIKE %s", (search_query, f"%{search_query}%"))
+            return fetch_record(cur)
 
     @staticmethod
-    def update_case(case_id, case_data, table_name):
-        conn = get_connection()
-        cur = conn.cursor()
+    def update_case(case_id, case_data, table_name, expected_version=None):
+        """Overwrite a case's fields; returns (outcome message, updated row or None).
+
+        With `expected_version` the update only applies if the case is still
+        at that version, so a form left open cannot undo a colleague's edit.
+        """
         update_query = f"""
-            UPDATE {table_name} SET
-                case_number = %s, case_title = %s, case_type = %s, location = %s,
-                company_name = %s, upcoming_date = %s, stage = %s, remarks = %s,
-                status = %s, claimant_advocate_name = %s, claimant_advocate_mobile_number = %s
-            WHERE id = %s
+            WITH prev AS (
+                SELECT id, upcoming_date, company_name, version FROM {table_name}
+                WHERE id = %(case_id)s
+                FOR UPDATE
+            ), updated AS (
+                UPDATE {table_name} AS c SET
+                    case_number = %(case_number)s, case_title = %(case_title)s, case_type = %(case_type)s,
+                    location = %(location)s, company_name = %(company_name)s, upcoming_date = %(upcoming_date)s,
+                    stage = %(stage)s, remarks = %(remarks)s, status = %(status)s,
+                    claimant_advocate_name = %(claimant_advocate_name)s,
+                    claimant_advocate_mobile_number = %(claimant_advocate_mobile_number)s
+                FROM prev
+                WHERE c.id = prev.id
+                  AND (%(version)s::int IS NULL OR prev.version = %(version)s::int)
+                RETURNING {case_select("c")}
+            )
+            SELECT CASE WHEN updated.id IS NOT NULL THEN 'updated'
+                        WHEN prev.id IS NULL THEN 'not_found'
+                        ELSE 'stale'
+                   END,
+                   prev.upcoming_date, prev.company_name, {case_select("updated")}
+            FROM (SELECT 1) AS one
+            LEFT JOIN prev ON true
+            LEFT JOIN updated ON true
         """
-        cur.execute(update_query, (
-            case_data["case_number"], case_data["case_title"], case_data["case_type"],
-            case_data["location"], case_data["company_name"], case_data["upcoming_date"],
-            case_data["stage"], case_data["remarks"], case_data["status"],
-            case_data["claimant_advocate_name"], case_data["claimant_advocate_mobile_number"],
-            case_id
-        ))
-        conn.commit()
-        cur.close()
-        conn.close()
-        return "Case updated successfully."
\ No newline at end of file
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(update_query, {**case_data, "case_id": case_id, "version": expected_version})
+            outcome, previous_date, previous_company, *row = cur.fetchone()
+            updated = CaseRecord._make(row) if outcome == "updated" else None
+            tags = set()
+            if updated is not None:
+                tags = cache.publish_case_changes(cur, [
+                    ((previous_date, previous_company), (updated.upcoming_date, updated.company_name))
+                ])
+        cache.case_cache.invalidate(tags)
+        return Case._UPDATE_MESSAGES[outcome], updated
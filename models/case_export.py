@@ -0,0 +1,88 @@
+from datetime import date
+
+from .archive import cases_source
+from .database import get_connection
+from .records import COLUMN_HEADERS
+
+# Exported columns, headed like config.json "headers" so that an export can be
+# fed straight back into the importer. Hearing history is written in the same
+# "YYYY-MM-DD, YYYY-MM-DD" form the importer reads.
+EXPORT_COLUMNS = [
+    (header, "array_to_string(previous_dates, ', ')" if column == "previous_dates" else column)
+    for column, header in COLUMN_HEADERS.items()
+]
+
+# scope -> (WHERE clause, number of date parameters it takes)
+EXPORT_SCOPES = {
+    "date": ("upcoming_date = %s", 1),
+    "range": ("upcoming_date BETWEEN %s AND %s", 2),
+    "pending": ("upcoming_date <= %s", 1),
+    "all": ("true", 0),
+}
+
+FORMATS = ("csv", "parquet")
+
+
+def _export_query(scope, table_name, include_archived=False):
+    where, _ = EXPORT_SCOPES[scope]
+    select_list = ", ".join(f'{expression} AS "{header}"' for header, expression in EXPORT_COLUMNS)
+    source = cases_source(table_name, include_archived)
+    return f"SELECT {select_list} FROM {source} AS cases WHERE {where} ORDER BY upcoming_date, id"
+
+
+def _scope_params(scope, dates):
+    if scope == "pending" and not dates:
+        dates = (date.today(),)
+    expected = EXPORT_SCOPES[scope][1]
+    if len(dates) != expected:
+        raise ValueError(f"Export scope '{scope}' needs {expected} date(s), got {len(dates)}.")
+    return tuple(dates)
+
+
+def export_csv(out, scope, dates=(), table_name="case_records", include_archived=False):
+    """Stream a scope straight from the server into `out` with COPY ... TO STDOUT.
+
+    Rows are never held in Python, so memory use does not depend on how many
+    cases are exported. `out` may be a text or binary file object.
+    """
+    params = _scope_params(scope, dates)
+    with get_connection() as conn, conn.cursor() as cur:
+        # COPY takes no bind parameters, so the dates are inlined by mogrify
+        query = cur.mogrify(_export_query(scope, table_name, include_archived), params).decode()
+        cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", out)
+
+
+def export_parquet(out, scope, dates=(), table_name="case_records", batch_size=10000, include_archived=False):
+    """Stream a scope into a Parquet file, one row group per server-side fetch."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet export needs the optional 'pyarrow' package.") from e
+
+    schema = pa.schema([
+        (header, pa.int64() if column == "id" else pa.date32() if column == "upcoming_date" else pa.string())
+        for header, column in EXPORT_COLUMNS
+    ])
+    params = _scope_params(scope, dates)
+    with get_connection() as conn:
+        with conn.cursor(name="case_export_stream") as cur:
+            cur.itersize = batch_size
+            cur.execute(_export_query(scope, table_name, include_archived), params)
+            with pq.ParquetWriter(out, schema) as writer:
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    columns = list(zip(*rows))
+                    writer.write_batch(pa.record_batch(
+                        [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                        schema=schema
+                    ))
+
+
+def export_cases(out, scope, file_format="csv", dates=(), table_name="case_records", include_archived=False):
+    if file_format == "parquet":
+        export_parquet(out, scope, dates, table_name, include_archived=include_archived)
+    else:
+        export_csv(out, scope, dates, table_name, include_archived)
@@ -0,0 +1,162 @@
+import csv
+import io
+import zipfile
+from datetime import date
+
+import pandas as pd
+from openpyxl.utils.exceptions import InvalidFileException
+
+import config_loader
+from . import cache
+from .database import get_connection
+from .records import COLUMN_HEADERS, ENUM_COLUMNS
+
+# Import file header -> case table column. Headers match config.json
+# "headers"; the table's own column names are accepted as well.
+IMPORT_COLUMNS = {header: column for column, header in COLUMN_HEADERS.items() if column != "id"}
+REQUIRED_COLUMNS = ("case_number", "case_title", "location")
+# Same limits as the Add Case form
+MAX_LENGTHS = {
+    "case_number": 10,
+    "case_title": 255,
+    "stage": 50,
+    "claimant_advocate_name": 100,
+    "claimant_advocate_mobile_number": 15,
+}
+
+
+def read_case_book(source, filename=None):
+    """Read a CSV or Excel case book into a frame of strings keyed by table column."""
+    name = (filename or getattr(source, "name", None) or str(source)).lower()
+    if name.endswith((".xlsx", ".xls")):
+        try:
+            frame = pd.read_excel(source, dtype=str)
+        except (KeyError, zipfile.BadZipFile, InvalidFileException, pd.errors.OptionError) as e:
+            # Named like a workbook but not one; CSV parse errors are ValueErrors already
+            raise ValueError(f"not a readable Excel workbook ({e})") from e
+    else:
+        frame = pd.read_csv(source, dtype=str, skipinitialspace=True)
+    frame = frame.rename(columns=lambda header: IMPORT_COLUMNS.get(str(header).strip(), str(header).strip()))
+    unknown = [column for column in frame.columns if column not in IMPORT_COLUMNS.values()]
+    frame = frame.drop(columns=unknown)
+    for column in IMPORT_COLUMNS.values():
+        if column not in frame:
+            frame[column] = None
+    # object dtype: pandas' string dtype would keep blanks as NaN, not None
+    frame = frame[list(IMPORT_COLUMNS.values())].astype(object).apply(lambda values: values.str.strip())
+    return frame.where(frame.notna() & (frame != ""), None)
+
+
+def _parse_history(value):
+    # Same "YYYY-MM-DD, YYYY-MM-DD" form the app used to store, as a date[] literal
+    if value is None:
+        return "{}"
+    dates = {date.fromisoformat(part.strip()) for part in value.split(",") if part.strip()}
+    return "{" + ",".join(str(d) for d in sorted(dates)) + "}"
+
+
+def _parse_dates(values):
+    # Each value on its own: ISO first, then day first (dd/mm/yyyy) as court
+    # dockets here are written. Parsing day first would swap an ISO date's
+    # month and day.
+    iso = pd.to_datetime(values, errors="coerce", format="ISO8601")
+    day_first = pd.to_datetime(values.where(iso.isna()), errors="coerce", format="mixed", dayfirst=True)
+    return iso.fillna(day_first)
+
+
+def validate_case_book(frame):
+    """Check every row; returns (valid_frame, errors).
+
+    `errors` is a list of (file_row, message) where file_row counts the
+    header as row 1. Rows repeating a (case_number, location) seen earlier
+    in the file are rejected so the first occurrence wins.
+    """
+    config = config_loader.load_config()
+    # Cases without a status start out like the Add Case form's default
+    frame = frame.assign(status=frame["status"].where(frame["status"].notna(), config.open_status))
+    problems = pd.Series([[] for _ in range(len(frame))], index=frame.index, dtype=object)
+
+    def flag(mask, message):
+        for index in frame.index[mask]:
+            problems[index].append(message)
+
+    for column in REQUIRED_COLUMNS:
+        flag(frame[column].isna(), f"{column} is required")
+    for column, limit in MAX_LENGTHS.items():
+        flag(frame[column].str.len() > limit, f"{column} is longer than {limit} characters")
+    for column, config_key in ENUM_COLUMNS.items():
+        allowed = getattr(config, config_key)
+        flag(frame[column].notna() & ~frame[column].isin(allowed), f"{column} must be one of {', '.join(allowed)}")
+
+    upcoming = _parse_dates(frame["upcoming_date"])
+    flag(frame["upcoming_date"].notna() & upcoming.isna(), "upcoming_date is not a valid date")
+    frame = frame.assign(upcoming_date=upcoming.dt.date.where(upcoming.notna(), None))
+
+    history = []
+    for index, value in frame["previous_dates"].items():
+        try:
+            history.append(_parse_history(value))
+        except (ValueError, TypeError):
+            history.append(None)
+            problems[index].append("previous_dates must be comma-separated dates")
+    frame = frame.assign(previous_dates=history)
+
+    flag(frame.duplicated(["case_number", "location"], keep="first") & frame["case_number"].notna(),
+         "duplicate of an earlier row with the same case number and location")
+
+    valid = problems.map(len) == 0
+    errors = [(index + 2, "; ".join(messages)) for index, messages in problems[~valid].items()]
+    return frame[valid], errors
+
+
+def load_case_book(frame, table_name="case_records"):
+    """COPY validated rows into a staging table and merge them in one transaction.
+
+    Cases whose (case_number, location) already exists are left untouched.
+    Returns (inserted_count, existing) where `existing` lists the skipped
+    (case_number, location) pairs.
+    """
+    columns = list(IMPORT_COLUMNS.values())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in frame.itertuples(index=False):
+        writer.writerow(row)
+    buffer.seek(0)
+
+    column_list = ", ".join(columns)
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE TEMP TABLE case_import_staging ON COMMIT DROP AS
+            SELECT {column_list} FROM {table_name} WITH NO DATA
+        """)
+        cur.copy_expert(f"COPY case_import_staging ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cur.execute(f"""
+            INSERT INTO {table_name} ({column_list})
+            SELECT {column_list} FROM case_import_staging
+            ON CONFLICT (case_number, location) DO NOTHING
+            RETURNING case_number, location, upcoming_date, company_name
+        """)
+        inserted = cur.fetchall()
+        tags = cache.publish_case_changes(cur, [(None, (row[2], row[3])) for row in inserted])
+    cache.case_cache.invalidate(tags)
+
+    inserted_keys = {(row[0], row[1]) for row in inserted}
+    existing = [
+        key for key in zip(frame["case_number"], frame["location"])
+        if key not in inserted_keys
+    ]
+    return len(inserted), existing
+
+
+def import_case_book(source, filename=None, table_name="case_records", dry_run=False):
+    """Read, validate and (unless dry_run) load a case book.
+
+    Returns a dict with the row errors, the number of inserted cases and the
+    (case_number, location) pairs skipped because they already exist.
+    """
+    frame = read_case_book(source, filename)
+    valid, errors = validate_case_book(frame)
+    result = {"rows": len(frame), "valid": len(valid), "errors": errors, "inserted": 0, "existing": []}
+    if not dry_run and len(valid):
+        result["inserted"], result["existing"] = load_case_book(valid, table_name)
+    return result
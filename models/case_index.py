@@ -0,0 +1,188 @@
+import bisect
+import re
+import threading
+import time
+
+from .cause_list import CHANGE_OVERLAP
+from .database import get_connection
+from .records import CASE_SELECT, fetch_records
+from .search import CASE_NUMBER, CASE_TITLE, ADVOCATE_NAME
+
+# Fields offered as you type, by search field name
+INDEXED_FIELDS = {
+    CASE_NUMBER: "case_number",
+    CASE_TITLE: "case_title",
+    ADVOCATE_NAME: "claimant_advocate_name",
+}
+# Suggestions are answered from memory; changed rows are re-read at most
+# this often, so typing never waits on the database.
+REFRESH_SECONDS = 10
+DEFAULT_LIMIT = 10
+
+_WORD = re.compile(r"\w+")
+
+
+def _normalise(text):
+    return " ".join(text.lower().split())
+
+
+def _keys(case):
+    """(key, field) pairs for a case: each field whole and from every later word on."""
+    keys = set()
+    for field, column in INDEXED_FIELDS.items():
+        value = getattr(case, column)
+        if not value:
+            continue
+        value = _normalise(value)
+        for word in _WORD.finditer(value):
+            keys.add((value[word.start():], field))
+        keys.add((value, field))
+    return keys
+
+
+def changed_cases(table_name, since=None):
+    """Rows changed since `since`, or every row when it is None.
+
+    Returns (as_of, changed, removed_ids): as_of is the database time to pass
+    as `since` next, removed_ids the cases archived since, or None for a
+    complete read.
+    """
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT now()")
+        as_of = cur.fetchone()[0]
+        if since is None:
+            cur.execute(f"SELECT {CASE_SELECT} FROM {table_name}")
+            return as_of, fetch_records(cur), None
+        cur.execute(f"SELECT {CASE_SELECT} FROM {table_name} WHERE updated_at >= %s",
+                    (since - CHANGE_OVERLAP,))
+        changed = fetch_records(cur)
+        cur.execute(f"SELECT id FROM {table_name}_archive WHERE archived_at >= %s",
+                    (since - CHANGE_OVERLAP,))
+        return as_of, changed, [row[0] for row in cur.fetchall()]
+
+
+def label(case):
+    """How a case is offered: number, title, location and claimant advocate."""
+    text = f"{case.case_number} - {case.case_title} ({case.location})"
+    return f"{text} - {case.claimant_advocate_name}" if case.claimant_advocate_name else text
+
+
+class CaseIndex:
+    """Sorted prefix index over case numbers, titles and advocate names.
+
+    Holds only ids, labels and versions; callers fetch the rows they pick.
+    One instance per table is shared by every session; see get_index.
+    """
+
+    def __init__(self, changed_cases, table_name):
+        self._changed_cases = changed_cases
+        self.table_name = table_name
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._entries = []  # sorted (key, id, field)
+        self._cases = {}  # id -> (label, version, keys)
+        self._labels = None  # sorted (id, label), built on first use after a change
+        self._as_of = None
+        self._checked_at = None
+
+    def _remove(self, case_id):
+        indexed = self._cases.pop(case_id, None)
+        if indexed is None:
+            return
+        for key, field in indexed[2]:
+            entry = (key, case_id, field)
+            position = bisect.bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+
+    def _apply(self, cases, removed_ids=()):
+        for case_id in removed_ids:
+            if case_id in self._cases:
+                self._remove(case_id)
+                self._labels = None
+        for case in cases:
+            current = self._cases.get(case.id)
+            # A refresh read before a save must not undo the saved row
+            if current is not None and current[1] > case.version:
+                continue
+            self._remove(case.id)
+            self._labels = None
+            keys = _keys(case)
+            self._cases[case.id] = (label(case), case.version, keys)
+            for key, field in keys:
+                bisect.insort(self._entries, (key, case.id, field))
+
+    def apply(self, cases):
+        """Patch rows saved by this process in without waiting for a refresh."""
+        with self._lock:
+            self._apply(cases)
+
+    def _due(self):
+        return self._checked_at is None or time.monotonic() - self._checked_at >= REFRESH_SECONDS
+
+    def refresh(self, force=False):
+        """Read the rows changed since the last refresh, if one is due."""
+        if not (force or self._due()):
+            return
+        # One session refreshes while the others keep answering from the
+        # current entries; only the first load is waited for.
+        if not self._refresh_lock.acquire(blocking=self._checked_at is None):
+            return
+        try:
+            if not (force or self._due()):
+                return
+            as_of, changed, removed_ids = self._changed_cases(self.table_name, self._as_of)
+            if removed_ids is None:
+                cases = {case.id: (label(case), case.version, _keys(case)) for case in changed}
+                entries = sorted((key, case_id, field) for case_id, (_, _, keys) in cases.items() for key, field in keys)
+                with self._lock:
+                    self._entries = entries
+                    self._cases = cases
+                    self._labels = None
+            else:
+                with self._lock:
+                    self._apply(changed, removed_ids)
+            self._as_of = as_of
+            self._checked_at = time.monotonic()
+        finally:
+            self._refresh_lock.release()
+
+    def labels(self):
+        """(id, label) for every indexed case, by label."""
+        with self._lock:
+            if self._labels is None:
+                self._labels = sorted(
+                    ((case_id, indexed[0]) for case_id, indexed in self._cases.items()), key=lambda item: item[1]
+                )
+            return self._labels
+
+    def suggest(self, query, fields=tuple(INDEXED_FIELDS), limit=DEFAULT_LIMIT):
+        """(id, label) of cases with a word in `fields` starting with `query`, in key order."""
+        prefix = _normalise(query)
+        if not prefix:
+            return []
+        ids = []
+        with self._lock:
+            position = bisect.bisect_left(self._entries, (prefix,))
+            while position < len(self._entries) and len(ids) < limit:
+                key, case_id, field = self._entries[position]
+                if not key.startswith(prefix):
+                    break
+                if field in fields and case_id not in ids:
+                    ids.append(case_id)
+                position += 1
+            return [(case_id, self._cases[case_id][0]) for case_id in ids]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(backend, table_name="case_records"):
+    """The process-wide index for `table_name` on `backend`, refreshed if due."""
+    with _indexes_lock:
+        index = _indexes.get((backend.name, table_name))
+        if index is None:
+            index = _indexes[(backend.name, table_name)] = CaseIndex(backend.changed_cases, table_name)
+    index.refresh()
+    return index
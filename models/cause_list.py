@@ -0,0 +1,80 @@
+from datetime import date, timedelta
+
+import config_loader
+from .database import get_connection
+from .records import CASE_COLUMNS, CASE_SELECT, CaseRecord, fetch_records
+
+# Snapshots older than this are dropped by each build
+KEEP_DAYS = 7
+# Changes are re-read from a little before the snapshot was built, so a
+# write whose transaction started earlier but committed later is not missed.
+# Patching is by id, so reading a change twice is harmless.
+CHANGE_OVERLAP = timedelta(minutes=5)
+
+
+def build_snapshot(list_date=None, table_name="case_records"):
+    """Store the cause list for `list_date` (default tomorrow), one row per location.
+
+    Every configured location gets a row, even with no cases, so an empty
+    list is served from the snapshot too. Returns (version, case count).
+    """
+    list_date = list_date or date.today() + timedelta(days=1)
+    case_row = ", ".join(f"c.{column}" for column in CASE_COLUMNS)
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(f"SELECT nextval('{table_name}_cause_list_version')")
+        version = cur.fetchone()[0]
+        cur.execute(f"DELETE FROM {table_name}_cause_lists WHERE list_date = %s OR list_date < %s",
+                    (list_date, date.today() - timedelta(days=KEEP_DAYS)))
+        cur.execute(f"""
+            WITH cases AS (
+                SELECT {CASE_SELECT} FROM {table_name} WHERE upcoming_date = %(list_date)s
+            ), locations AS (
+                SELECT unnest(%(locations)s::text[]) AS location
+                UNION
+                SELECT location FROM cases
+            )
+            INSERT INTO {table_name}_cause_lists (list_date, location, version, built_at, cases)
+            SELECT %(list_date)s, l.location, %(version)s, now(),
+                   COALESCE(jsonb_agg(jsonb_build_array({case_row}) ORDER BY c.id) FILTER (WHERE c.id IS NOT NULL), '[]')
+            FROM locations AS l
+            LEFT JOIN cases AS c USING (location)
+            GROUP BY l.location
+            RETURNING jsonb_array_length(cases)
+        """, {"list_date": list_date, "locations": list(config_loader.load_config().locations), "version": version})
+        count = sum(row[0] for row in cur.fetchall())
+    return version, count
+
+
+def _from_json(row):
+    values = dict(zip(CASE_COLUMNS, row))
+    if values["upcoming_date"] is not None:
+        values["upcoming_date"] = date.fromisoformat(values["upcoming_date"])
+    values["previous_dates"] = [date.fromisoformat(day) for day in values["previous_dates"]]
+    return CaseRecord(**values)
+
+
+def get_cause_list(list_date, table_name="case_records"):
+    """The snapshot for `list_date` patched with rows changed since it was built.
+
+    Returns (cases, version), or None when no snapshot exists for the date.
+    """
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT version, built_at, cases FROM {table_name}_cause_lists
+            WHERE list_date = %s
+        """, (list_date,))
+        snapshot = cur.fetchall()
+        if not snapshot:
+            return None
+        version = max(row[0] for row in snapshot)
+        built_at = min(row[1] for row in snapshot)
+        cur.execute(f"SELECT {CASE_SELECT} FROM {table_name} WHERE updated_at >= %s",
+                    (built_at - CHANGE_OVERLAP,))
+        changed = fetch_records(cur)
+    cases = {case.id: case for row in snapshot for case in map(_from_json, row[2])}
+    for case in changed:
+        if case.upcoming_date == list_date:
+            cases[case.id] = case
+        else:
+            cases.pop(case.id, None)
+    return sorted(cases.values(), key=lambda case: (case.location, case.id)), version
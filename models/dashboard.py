@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+
+from .database import get_connection
+from . import schema
+
+# How far ahead the hearing-load chart looks
+HEARING_LOAD_DAYS = 30
+
+# Shared with models.async_queries, which runs them on the async pool
+COUNTS_QUERY = """
+    SELECT dimension, value, cases, open_cases
+    FROM {table}_counts
+    WHERE cases > 0
+    ORDER BY dimension, cases DESC, value
+"""
+HEARING_LOAD_QUERY = """
+    SELECT hearing_date, cases, open_cases
+    FROM {table}_day_counts
+    WHERE hearing_date BETWEEN %s AND %s AND cases > 0
+    ORDER BY hearing_date
+"""
+OVERDUE_QUERY = "SELECT COALESCE(sum(open_cases), 0) FROM {table}_day_counts WHERE hearing_date < %s"
+
+
+def group_counts(rows):
+    counts = {dimension: [] for dimension in schema.SUMMARY_DIMENSIONS}
+    for dimension, value, cases, open_cases in rows:
+        counts.setdefault(dimension, []).append((value, cases, open_cases))
+    return counts
+
+
+def hearing_load_params(days=HEARING_LOAD_DAYS):
+    today = date.today()
+    return (today, today + timedelta(days=days))
+
+
+def get_counts(table_name="case_records"):
+    """Case and open-case counts per dimension value, e.g. {"status": [(value, cases, open_cases)]}."""
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(COUNTS_QUERY.format(table=table_name))
+        return group_counts(cur.fetchall())
+
+
+def get_hearing_load(table_name="case_records", days=HEARING_LOAD_DAYS):
+    """(hearing_date, cases, open_cases) for each of the next `days` days that has hearings."""
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(HEARING_LOAD_QUERY.format(table=table_name), hearing_load_params(days))
+        return cur.fetchall()
+
+
+def get_overdue_count(table_name="case_records"):
+    """Open cases whose upcoming date has already passed."""
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(OVERDUE_QUERY.format(table=table_name), (date.today(),))
+        return cur.fetchone()[0]
+
+
+def refresh_summary(table_name="case_records"):
+    """Recount the summary tables, e.g. after rows were changed with triggers disabled."""
+    with get_connection() as conn, conn.cursor() as cur:
+        schema.rebuild_summary(cur, table_name)
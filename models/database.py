@@ -1,12 +1,161 @@
+import threading
+import time
+from contextlib import contextmanager
+
 import psycopg2
+from psycopg2 import extensions, pool
 import streamlit as st
 
-def get_connection():
-    config = {
+import config_loader
+from . import instrumentation
+
+# One pool per process, shared by every Streamlit session (script runs happen
+# on worker threads of the same process, so a module-level pool is enough).
+_pool = None
+_pool_lock = threading.Lock()
+# ThreadedConnectionPool raises as soon as it is exhausted; callers queue on
+# this semaphore instead so a busy morning waits rather than errors out.
+_slots = None
+# id(conn) -> monotonic time the connection was last handed back to the pool
+_last_used = {}
+
+
+def _pool_settings():
+    settings = {
+        "min_connections": 1,
+        "max_connections": 10,
+        "health_check_after": 30,
+        "checkout_timeout": 30,
+        "connect_timeout": 10,
+    }
+    settings.update(config_loader.load_config().section("pool"))
+    settings.update(st.secrets["database"].get("pool", {}))
+    return settings
+
+
+def _connection_params(settings):
+    return {
         "host": st.secrets["database"]["host"],
         "port": st.secrets["database"]["port"],
         "database": st.secrets["database"]["database"],
         "user": st.secrets["database"]["user"],
-        "password": st.secrets["database"]["password"]
+        "password": st.secrets["database"]["password"],
+        "connect_timeout": settings["connect_timeout"],
+        # Let the OS notice half-open sockets so dead connections surface as
+        # errors instead of hanging a clerk's page.
+        "keepalives": 1,
+        "keepalives_idle": 30,
+        "keepalives_interval": 10,
+        "keepalives_count": 3,
     }
-    return psycopg2.connect(**config)
+
+
+def get_pool():
+    global _pool, _slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                settings = _pool_settings()
+                _pool = pool.ThreadedConnectionPool(
+                    settings["min_connections"],
+                    settings["max_connections"],
+                    **_connection_params(settings)
+                )
+                _pool.health_check_after = settings["health_check_after"]
+                _pool.checkout_timeout = settings["checkout_timeout"]
+                _slots = threading.BoundedSemaphore(settings["max_connections"])
+    return _pool
+
+
+def open_dedicated_connection():
+    """An unpooled connection for long-lived uses such as LISTEN."""
+    return psycopg2.connect(**_connection_params(_pool_settings()))
+
+
+def close_pool():
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+            _slots = None
+            _last_used.clear()
+
+
+def _is_healthy(conn, health_check_after):
+    if conn.closed:
+        return False
+    if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+        return False
+    # Only ping connections that sat idle long enough to have been dropped by
+    # the server or a firewall; recently used ones are trusted.
+    idle_for = time.monotonic() - _last_used.get(id(conn), 0)
+    if idle_for < health_check_after:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _checkout():
+    connection_pool = get_pool()
+    slots = _slots
+    if not slots.acquire(timeout=connection_pool.checkout_timeout):
+        raise pool.PoolError("Timed out waiting for a free database connection.")
+    try:
+        conn = _checkout_healthy(connection_pool)
+    except BaseException:
+        slots.release()
+        raise
+    return conn, connection_pool, slots
+
+
+def _checkout_healthy(connection_pool):
+    # A pool can hold at most max_connections stale entries; one more attempt
+    # than that is guaranteed to end with a freshly opened connection.
+    for _ in range(connection_pool.maxconn + 1):
+        conn = connection_pool.getconn()
+        if _is_healthy(conn, connection_pool.health_check_after):
+            return conn
+        _last_used.pop(id(conn), None)
+        connection_pool.putconn(conn, close=True)
+    raise psycopg2.OperationalError("Could not obtain a healthy database connection.")
+
+
+def _release(conn, connection_pool, slots):
+    broken = conn.closed or conn.get_transaction_status() == extensions.TRANSACTION_STATUS_UNKNOWN
+    if broken:
+        _last_used.pop(id(conn), None)
+    else:
+        _last_used[id(conn)] = time.monotonic()
+    connection_pool.putconn(conn, close=broken)
+    slots.release()
+
+
+@contextmanager
+def get_connection():
+    """Borrow a pooled connection for one unit of work.
+
+    The transaction is committed when the block exits normally and rolled
+    back if it raises; either way the connection goes back to the pool.
+    """
+    if instrumentation.enabled:
+        start = time.perf_counter()
+        conn, connection_pool, slots = _checkout()
+        instrumentation.record_connection_wait((time.perf_counter() - start) * 1000)
+        conn.cursor_factory = instrumentation.InstrumentedCursor
+    else:
+        conn, connection_pool, slots = _checkout()
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        _release(conn, connection_pool, slots)
@@ -0,0 +1,226 @@
+import contextvars
+import logging
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from psycopg2 import extensions
+
+import config_loader
+
+slow_query_logger = logging.getLogger(__name__ + ".slow")
+
+_settings = {"enabled": False, "slow_query_ms": 200, "window": 1000, "slow_log_size": 200}
+_settings.update(config_loader.load_config().section("instrumentation"))
+
+# Checked on every database call; when False nothing else here runs.
+enabled = bool(_settings["enabled"])
+
+_current_page = contextvars.ContextVar("current_page", default=None)
+# Set while the whole script runs, so the page fragment inside it is not
+# also counted as a fragment rerun
+_in_app_run = contextvars.ContextVar("in_app_run", default=False)
+# Pool wait of the current unit of work, charged to its first statement
+_pending_wait_ms = contextvars.ContextVar("pending_wait_ms", default=0.0)
+
+_WHITESPACE = re.compile(r"\s+")
+# Literals only reach SQL text through mogrify (e.g. COPY); strip them so no
+# case data ends up in the stats or the slow-query log.
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def fingerprint(sql):
+    if isinstance(sql, bytes):
+        sql = sql.decode(errors="replace")
+    elif not isinstance(sql, str):
+        sql = str(sql)
+    return _LITERALS.sub("?", _WHITESPACE.sub(" ", sql).strip())[:500]
+
+
+class RollingHistogram:
+    """The most recent `window` samples of one metric."""
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {}
+        return {
+            "count": self.count,
+            "p50": ordered[len(ordered) // 2],
+            "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            "max": ordered[-1],
+            "mean": statistics.fmean(ordered),
+        }
+
+
+class _Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries = {}  # query name -> {"wall", "wait", "rows": RollingHistogram, "fingerprint"}
+        self.pages = {}  # page -> RollingHistogram of render time
+        self.reruns = {}  # ("app" | "fragment", page) -> RollingHistogram of script run time
+        self.slow_queries = deque(maxlen=_settings["slow_log_size"])
+
+
+stats = _Stats()
+
+
+def _query_name():
+    # The first frame outside the database plumbing names the query, e.g.
+    # "Case.get_cases_by_date" or, for module-level functions, "search.search_cases".
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module not in (__name__, "models.database", "psycopg2.extras") and not module.startswith("contextlib"):
+            code = frame.f_code
+            name = getattr(code, "co_qualname", code.co_name)
+            return name if "." in name else f"{module.rsplit('.', 1)[-1]}.{name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def record_query(name, sql, rows, wall_ms, wait_ms):
+    window = _settings["window"]
+    with stats.lock:
+        entry = stats.queries.get(name)
+        if entry is None:
+            entry = stats.queries[name] = {
+                "wall": RollingHistogram(window),
+                "wait": RollingHistogram(window),
+                "rows": RollingHistogram(window),
+                "fingerprint": fingerprint(sql),
+            }
+        entry["wall"].add(wall_ms)
+        entry["wait"].add(wait_ms)
+        entry["rows"].add(rows)
+    if wall_ms >= _settings["slow_query_ms"]:
+        slow = {
+            "at": time.time(),
+            "page": _current_page.get(),
+            "query": name,
+            "sql": fingerprint(sql),
+            "rows": rows,
+            "wall_ms": round(wall_ms, 1),
+            "wait_ms": round(wait_ms, 1),
+        }
+        stats.slow_queries.append(slow)
+        slow_query_logger.warning("slow query %(query)s %(wall_ms)sms rows=%(rows)s page=%(page)s: %(sql)s", slow)
+
+
+def record_connection_wait(wait_ms):
+    _pending_wait_ms.set(_pending_wait_ms.get() + wait_ms)
+
+
+def _take_wait():
+    wait_ms = _pending_wait_ms.get()
+    if wait_ms:
+        _pending_wait_ms.set(0.0)
+    return wait_ms
+
+
+class InstrumentedCursor(extensions.cursor):
+    """Cursor that times each statement; installed on pooled connections only when enabled."""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_query(_query_name(), query, self.rowcount, (time.perf_counter() - start) * 1000, _take_wait())
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            record_query(_query_name(), query, self.rowcount, (time.perf_counter() - start) * 1000, _take_wait())
+
+    def copy_expert(self, sql, file, size=8192):
+        start = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            record_query(_query_name(), sql, self.rowcount, (time.perf_counter() - start) * 1000, _take_wait())
+
+
+@contextmanager
+def page_timer(page):
+    """Time one render of `page` and tag the queries it runs with its name."""
+    if not enabled:
+        yield
+        return
+    token = _current_page.set(page)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        _current_page.reset(token)
+        with stats.lock:
+            stats.pages.setdefault(page, RollingHistogram(_settings["window"])).add(elapsed_ms)
+
+
+@contextmanager
+def rerun_timer(scope, page):
+    """Time one Streamlit script run: the whole app ("app") or a page fragment alone ("fragment")."""
+    if not enabled or (scope == "fragment" and _in_app_run.get()):
+        yield
+        return
+    token = _in_app_run.set(True) if scope == "app" else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if token is not None:
+            _in_app_run.reset(token)
+        with stats.lock:
+            stats.reruns.setdefault((scope, page), RollingHistogram(_settings["window"])).add(elapsed_ms)
+
+
+def snapshot():
+    """Copy of the current statistics for display."""
+    with stats.lock:
+        queries = [
+            {
+                "query": name,
+                **{f"{key}_ms": value for key, value in entry["wall"].summary().items() if key != "count"},
+                "calls": entry["wall"].count,
+                "mean_wait_ms": entry["wait"].summary().get("mean", 0.0),
+                "mean_rows": entry["rows"].summary().get("mean", 0.0),
+                "sql": entry["fingerprint"],
+            }
+            for name, entry in stats.queries.items()
+        ]
+        pages = [
+            {"page": page, "renders": histogram.count,
+             **{f"{key}_ms": value for key, value in histogram.summary().items() if key != "count"}}
+            for page, histogram in stats.pages.items()
+        ]
+        reruns = [
+            {"scope": scope, "page": page, "runs": histogram.count,
+             **{f"{key}_ms": value for key, value in histogram.summary().items() if key != "count"}}
+            for (scope, page), histogram in stats.reruns.items()
+        ]
+        slow = list(stats.slow_queries)
+    return {"queries": queries, "pages": pages, "reruns": reruns, "slow_queries": slow, "slow_query_ms": _settings["slow_query_ms"]}
+
+
+def reset():
+    with stats.lock:
+        stats.queries.clear()
+        stats.pages.clear()
+        stats.reruns.clear()
+        stats.slow_queries.clear()
@@ -0,0 +1,143 @@
+from datetime import date
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+import config_loader
+
+
+class CaseRecord(NamedTuple):
+    """One case_records row, in the column order of CASE_COLUMNS."""
+    id: int
+    case_number: str
+    case_title: str
+    case_type: Optional[str]
+    location: str
+    company_name: Optional[str]
+    upcoming_date: Optional[date]
+    previous_dates: list
+    stage: Optional[str]
+    remarks: Optional[str]
+    status: Optional[str]
+    claimant_advocate_name: Optional[str]
+    claimant_advocate_mobile_number: Optional[str]
+    # Bumped by every UPDATE; edits carry the version they were made against
+    version: int = 0
+
+
+CASE_COLUMNS = CaseRecord._fields
+# Explicit projection used instead of SELECT *, so schema additions do not
+# shift the columns every screen reads.
+CASE_SELECT = ", ".join(CASE_COLUMNS)
+# What the case lists show; editable lists also keep "version" (hidden)
+DISPLAY_COLUMNS = tuple(column for column in CASE_COLUMNS if column != "version")
+
+# Column -> display header (config.json "headers" uses the same names)
+COLUMN_HEADERS = {
+    "id": "ID",
+    "case_number": "Case Number",
+    "case_title": "Case Title",
+    "case_type": "Case Type",
+    "location": "Location",
+    "company_name": "Company Name",
+    "upcoming_date": "Upcoming Date",
+    "previous_dates": "Previous Dates",
+    "stage": "Stage",
+    "remarks": "Remarks",
+    "status": "Status",
+    "claimant_advocate_name": "Claimant Advocate Name",
+    "claimant_advocate_mobile_number": "Claimant Advocate Mobile Number",
+}
+
+# Columns holding one of a config.json list, stored as categoricals
+ENUM_COLUMNS = {
+    "case_type": "case_types",
+    "location": "locations",
+    "company_name": "company_names",
+    "status": "statuses",
+}
+
+
+def case_select(alias=None):
+    """CASE_SELECT, optionally qualified with a table alias."""
+    if alias is None:
+        return CASE_SELECT
+    return ", ".join(f"{alias}.{column}" for column in CASE_COLUMNS)
+
+
+def display_columns(extra=()):
+    """The columns case lists send to the browser: config.json "listHeaders" plus `extra`."""
+    shown = set(config_loader.load_config().list_headers)
+    return tuple(column for column in CASE_COLUMNS if column in extra or COLUMN_HEADERS.get(column) in shown)
+
+
+def fetch_records(cur):
+    return [CaseRecord._make(row) for row in cur.fetchall()]
+
+
+def fetch_record(cur):
+    row = cur.fetchone()
+    return None if row is None else CaseRecord._make(row)
+
+
+def _categorical(values, allowed):
+    # Rows written before a config change may hold values no longer listed;
+    # keep them as extra categories rather than turning them into NaN.
+    extra = sorted({value for value in values if value is not None} - set(allowed))
+    return pd.Categorical(values, categories=[*allowed, *extra])
+
+
+def records_to_frame(rows, columns=DISPLAY_COLUMNS):
+    """Build a display frame column by column with compact dtypes.
+
+    Dates become datetime64, enum columns become categoricals over their
+    config.json lists and ids and versions int64; columns are titled with
+    their headers.
+    """
+    config = config_loader.load_config()
+    values_by_column = dict(zip(CASE_COLUMNS, zip(*rows))) if rows else {column: () for column in columns}
+    data = {}
+    for column in columns:
+        values = values_by_column[column]
+        if column in ("id", "version"):
+            data[column] = np.fromiter(values, dtype=np.int64, count=len(values))
+        elif column == "upcoming_date":
+            data[column] = pd.to_datetime(pd.Series(values, dtype=object))
+        elif column in ENUM_COLUMNS:
+            data[column] = _categorical(values, getattr(config, ENUM_COLUMNS[column]))
+        else:
+            data[column] = pd.Series(values, dtype=object)
+    frame = pd.DataFrame(data, columns=list(columns))
+    return frame.rename(columns=COLUMN_HEADERS)
+
+
+def patch_case_frame(frame, rows, keep):
+    """Apply rows returned by a save to a copy of a frame from records_to_frame.
+
+    Rows for which keep(row) is true are updated; the others (e.g.
+    rescheduled off the displayed day) are dropped. Rows not in the frame
+    are ignored. The frame may be shared between sessions, so it is copied
+    rather than changed. Returns the patched copy.
+    """
+    frame = frame.copy()
+    position_of = pd.Series(frame.index, index=frame["ID"].to_numpy())
+    dropped = []
+    for row in rows:
+        if row.id not in position_of:
+            continue
+        index = position_of[row.id]
+        if not keep(row):
+            dropped.append(index)
+            continue
+        for column in CASE_COLUMNS:
+            name = COLUMN_HEADERS.get(column, column)
+            if name not in frame:
+                continue
+            value = getattr(row, column)
+            if column == "upcoming_date":
+                value = pd.Timestamp(value) if value is not None else pd.NaT
+            elif column in ENUM_COLUMNS and value is not None and value not in frame[name].cat.categories:
+                frame[name] = frame[name].cat.add_categories([value])
+            frame.at[index, name] = value
+    return frame.drop(index=dropped) if dropped else frame
@@ -0,0 +1,443 @@
+import json
+import logging
+import threading
+
+from psycopg2 import sql
+
+from .database import get_connection
+import config_loader
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for pg_advisory_lock so two app replicas starting together
+# do not both try to apply the same migration.
+MIGRATION_LOCK_KEY = 72140519
+
+# Turns the legacy "YYYY-MM-DD, YYYY-MM-DD" text into a sorted, de-duplicated
+# date array. Anything that is not an ISO date (e.g. the "None" that used to be
+# appended for cases without an upcoming date) is dropped.
+HISTORY_TO_DATES_FUNCTION = r"""
+    CREATE OR REPLACE FUNCTION pg_temp.history_to_dates(history text)
+    RETURNS date[] LANGUAGE sql IMMUTABLE AS $$
+        SELECT COALESCE(array_agg(DISTINCT d::date ORDER BY d::date), '{}')
+        FROM unnest(string_to_array(history, ', ')) AS d
+        WHERE d ~ '^\d{4}-\d{2}-\d{2}$'
+    $$
+"""
+
+
+def _create_case_records(cur, table_name):
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            id SERIAL PRIMARY KEY,
+            case_number VARCHAR(10) NOT NULL,
+            case_title VARCHAR(255) NOT NULL,
+            case_type VARCHAR(50),
+            location VARCHAR(100) NOT NULL,
+            company_name VARCHAR(100),
+            upcoming_date DATE,
+            previous_dates DATE[] NOT NULL DEFAULT '{{}}',
+            stage VARCHAR(50),
+            remarks TEXT,
+            status VARCHAR(20),
+            claimant_advocate_name VARCHAR(100),
+            claimant_advocate_mobile_number VARCHAR(15)
+        )
+    """)
+
+
+def _migrate_hearing_history(cur, table_name):
+    # Convert previous_dates from comma-joined text in place so its position
+    # (and therefore the config.json headers) stays the same.
+    cur.execute("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_name = %s AND column_name = 'previous_dates'
+    """, (table_name,))
+    row = cur.fetchone()
+    if row is not None and row[0] != "ARRAY":
+        cur.execute(HISTORY_TO_DATES_FUNCTION)
+        cur.execute(f"""
+            ALTER TABLE {table_name}
+                ALTER COLUMN previous_dates TYPE date[] USING pg_temp.history_to_dates(previous_dates),
+                ALTER COLUMN previous_dates SET DEFAULT '{{}}',
+                ALTER COLUMN previous_dates SET NOT NULL
+        """)
+    # Serves "cases heard on date X" via previous_dates @> ARRAY[X]
+    cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS {table_name}_previous_dates_gin
+        ON {table_name} USING gin (previous_dates)
+    """)
+
+
+def _add_case_number_location_unique(cur, table_name):
+    cur.execute(f"""
+        SELECT case_number, location, count(*)
+        FROM {table_name}
+        GROUP BY case_number, location
+        HAVING count(*) > 1
+        LIMIT 20
+    """)
+    duplicates = cur.fetchall()
+    if duplicates:
+        listed = ", ".join(f"{number} @ {location} (x{count})" for number, location, count in duplicates)
+        raise RuntimeError(f"Resolve duplicate case numbers before migrating: {listed}")
+    # Also serves the case_number = %s lookups as its leading column
+    cur.execute(f"""
+        ALTER TABLE {table_name}
+        ADD CONSTRAINT {table_name}_case_number_location_key UNIQUE (case_number, location)
+    """)
+
+
+def _add_upcoming_date_index(cur, table_name):
+    # id is included so the pending list can page by (upcoming_date, id)
+    cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS {table_name}_upcoming_date_idx
+        ON {table_name} (upcoming_date, id)
+    """)
+
+
+def _add_trigram_indexes(cur, table_name):
+    cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for column in ("case_title", "company_name"):
+        cur.execute(f"""
+            CREATE INDEX IF NOT EXISTS {table_name}_{column}_trgm
+            ON {table_name} USING gin ({column} gin_trgm_ops)
+        """)
+
+
+def _add_search_trigram_indexes(cur, table_name):
+    # Case-number prefixes, fuzzy advocate names and mobile-number fragments
+    # used by models.search
+    for column in ("case_number", "claimant_advocate_name", "claimant_advocate_mobile_number"):
+        cur.execute(f"""
+            CREATE INDEX IF NOT EXISTS {table_name}_{column}_trgm
+            ON {table_name} USING gin ({column} gin_trgm_ops)
+        """)
+
+
+# Dimensions the dashboard counts cases by
+SUMMARY_DIMENSIONS = ("status", "company_name", "location", "case_type")
+
+# Source of +1/-1 row deltas for each trigger event, read from the
+# statement's transition tables.
+_SUMMARY_DELTAS = {
+    "insert": "SELECT 1 AS sign, * FROM new_rows",
+    "delete": "SELECT -1 AS sign, * FROM old_rows",
+    "update": "SELECT -1 AS sign, * FROM old_rows UNION ALL SELECT 1 AS sign, * FROM new_rows",
+}
+
+
+def _summary_statements(cur, table_name, delta_source, open_status):
+    # The status is quoted by psycopg2: it ends up in function bodies, where
+    # query parameters cannot reach.
+    open_status = sql.Literal(open_status).as_string(cur)
+    dimension_values = ", ".join(f"('{dimension}', delta.{dimension})" for dimension in SUMMARY_DIMENSIONS)
+    # Rows are upserted in key order so concurrent writers lock counters in
+    # the same order, and net-zero deltas (e.g. a stage edit) write nothing.
+    return f"""
+        WITH delta AS ({delta_source})
+        INSERT INTO {table_name}_counts AS counts (dimension, value, cases, open_cases)
+        SELECT dim.dimension, COALESCE(dim.value, ''), sum(delta.sign),
+               COALESCE(sum(delta.sign) FILTER (WHERE delta.status = {open_status}), 0)
+        FROM delta CROSS JOIN LATERAL (VALUES {dimension_values}) AS dim(dimension, value)
+        GROUP BY 1, 2
+        HAVING sum(delta.sign) <> 0
+            OR COALESCE(sum(delta.sign) FILTER (WHERE delta.status = {open_status}), 0) <> 0
+        ORDER BY 1, 2
+        ON CONFLICT (dimension, value) DO UPDATE SET
+            cases = counts.cases + EXCLUDED.cases,
+            open_cases = counts.open_cases + EXCLUDED.open_cases;
+
+        WITH delta AS ({delta_source})
+        INSERT INTO {table_name}_day_counts AS days (hearing_date, cases, open_cases)
+        SELECT delta.upcoming_date, sum(delta.sign),
+               COALESCE(sum(delta.sign) FILTER (WHERE delta.status = {open_status}), 0)
+        FROM delta
+        WHERE delta.upcoming_date IS NOT NULL
+        GROUP BY 1
+        HAVING sum(delta.sign) <> 0
+            OR COALESCE(sum(delta.sign) FILTER (WHERE delta.status = {open_status}), 0) <> 0
+        ORDER BY 1
+        ON CONFLICT (hearing_date) DO UPDATE SET
+            cases = days.cases + EXCLUDED.cases,
+            open_cases = days.open_cases + EXCLUDED.open_cases;
+    """
+
+
+def _create_summary_functions(cur, table_name, open_status):
+    for event, delta_source in _SUMMARY_DELTAS.items():
+        cur.execute(f"""
+            CREATE OR REPLACE FUNCTION {table_name}_summary_{event}() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                {_summary_statements(cur, table_name, delta_source, open_status)}
+                RETURN NULL;
+            END
+            $$
+        """)
+
+
+def rebuild_summary(cur, table_name):
+    """Recount the dashboard summary tables from scratch.
+
+    Also recreates the trigger functions, which count the open status as
+    configured when they were created.
+    """
+    open_status = config_loader.load_config().open_status
+    cur.execute(f"LOCK TABLE {table_name} IN SHARE MODE")
+    _create_summary_functions(cur, table_name, open_status)
+    cur.execute(f"TRUNCATE {table_name}_counts, {table_name}_day_counts")
+    cur.execute(_summary_statements(cur, table_name, f"SELECT 1 AS sign, * FROM {table_name}", open_status))
+
+
+def _add_dashboard_summary(cur, table_name):
+    # Aggregates kept current by statement-level triggers, so the dashboard
+    # reads a few hundred counter rows instead of scanning the case table.
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table_name}_counts (
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            cases BIGINT NOT NULL DEFAULT 0,
+            open_cases BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimension, value)
+        )
+    """)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table_name}_day_counts (
+            hearing_date DATE PRIMARY KEY,
+            cases BIGINT NOT NULL DEFAULT 0,
+            open_cases BIGINT NOT NULL DEFAULT 0
+        )
+    """)
+    _create_summary_functions(cur, table_name, config_loader.load_config().open_status)
+    for event in _SUMMARY_DELTAS:
+        transition = {
+            "insert": "NEW TABLE AS new_rows",
+            "delete": "OLD TABLE AS old_rows",
+            "update": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        }[event]
+        cur.execute(f"DROP TRIGGER IF EXISTS {table_name}_summary_{event} ON {table_name}")
+        cur.execute(f"""
+            CREATE TRIGGER {table_name}_summary_{event}
+            AFTER {event.upper()} ON {table_name}
+            REFERENCING {transition}
+            FOR EACH STATEMENT EXECUTE FUNCTION {table_name}_summary_{event}()
+        """)
+    rebuild_summary(cur, table_name)
+
+
+def _add_updated_at_and_cause_lists(cur, table_name):
+    # updated_at lets readers of a precomputed cause list pick up rows
+    # changed after it was built
+    cur.execute(f"""
+        ALTER TABLE {table_name}
+        ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    """)
+    cur.execute(f"""
+        CREATE OR REPLACE FUNCTION {table_name}_touch() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.updated_at := now();
+            RETURN NEW;
+        END
+        $$
+    """)
+    cur.execute(f"DROP TRIGGER IF EXISTS {table_name}_touch ON {table_name}")
+    cur.execute(f"""
+        CREATE TRIGGER {table_name}_touch
+        BEFORE UPDATE ON {table_name}
+        FOR EACH ROW EXECUTE FUNCTION {table_name}_touch()
+    """)
+    cur.execute(f"CREATE INDEX IF NOT EXISTS {table_name}_updated_at_idx ON {table_name} (updated_at)")
+    # One row per (date, location): the cases as a JSON array of CASE_COLUMNS rows
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table_name}_cause_lists (
+            list_date DATE NOT NULL,
+            location TEXT NOT NULL,
+            version BIGINT NOT NULL,
+            built_at TIMESTAMPTZ NOT NULL,
+            cases JSONB NOT NULL,
+            PRIMARY KEY (list_date, location)
+        )
+    """)
+    cur.execute(f"CREATE SEQUENCE IF NOT EXISTS {table_name}_cause_list_version")
+
+
+def _add_archive_table(cur, table_name):
+    # Closed cases are moved here by models.archive; the same columns plus
+    # when they were archived
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table_name}_archive (
+            LIKE {table_name},
+            archived_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (id)
+        )
+    """)
+    cur.execute(f"CREATE INDEX IF NOT EXISTS {table_name}_archive_upcoming_date_idx ON {table_name}_archive (upcoming_date, id)")
+    for column in ("case_number", "case_title", "company_name", "claimant_advocate_name", "claimant_advocate_mobile_number"):
+        cur.execute(f"""
+            CREATE INDEX IF NOT EXISTS {table_name}_archive_{column}_trgm
+            ON {table_name}_archive USING gin ({column} gin_trgm_ops)
+        """)
+
+
+def _add_version_column(cur, table_name):
+    # Optimistic concurrency: every UPDATE bumps version, and writers that
+    # pass the version they read only succeed if nobody changed the row since
+    for table in (table_name, f"{table_name}_archive"):
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1")
+    cur.execute(f"""
+        CREATE OR REPLACE FUNCTION {table_name}_touch() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.updated_at := now();
+            NEW.version := OLD.version + 1;
+            RETURN NEW;
+        END
+        $$
+    """)
+
+
+def _add_archived_at_index(cur, table_name):
+    # The typeahead index polls the archive for cases moved out since its last refresh
+    cur.execute(f"CREATE INDEX IF NOT EXISTS {table_name}_archive_archived_at_idx ON {table_name}_archive (archived_at)")
+
+
+# Append only: a deployed version number must never change meaning.
+MIGRATIONS = [
+    (1, "create case table", _create_case_records),
+    (2, "hearing history as date[]", _migrate_hearing_history),
+    (3, "unique case number per location", _add_case_number_location_unique),
+    (4, "upcoming date index", _add_upcoming_date_index),
+    (5, "trigram indexes for title and company search", _add_trigram_indexes),
+    (6, "trigram indexes for case number, advocate and mobile search", _add_search_trigram_indexes),
+    (7, "dashboard summary tables", _add_dashboard_summary),
+    (8, "updated_at column and cause-list snapshots", _add_updated_at_and_cause_lists),
+    (9, "archive table for closed cases", _add_archive_table),
+    (10, "row version for optimistic concurrency", _add_version_column),
+    (11, "archived_at index", _add_archived_at_index),
+]
+
+
+def _applied_versions(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+
+def migrate(table_name=None):
+    """Apply every pending migration, each in its own transaction.
+
+    Returns the list of versions that were applied by this call.
+    """
+    table_name = table_name or config_loader.load_config().table_name
+    newly_applied = []
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+        try:
+            applied = _applied_versions(cur)
+            conn.commit()
+            for version, description, apply in MIGRATIONS:
+                if version in applied:
+                    continue
+                logger.info("Applying schema migration %s: %s", version, description)
+                try:
+                    apply(cur, table_name)
+                    cur.execute(
+                        "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                        (version, description)
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                newly_applied.append(version)
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+    return newly_applied
+
+
+def pending_migrations():
+    with get_connection() as conn, conn.cursor() as cur:
+        applied = _applied_versions(cur)
+    return [(version, description) for version, description, _ in MIGRATIONS if version not in applied]
+
+
+# Representative shapes of the hot Case queries. Parameters only need the
+# right types; the planner decides index usage from the predicate shape.
+HOT_QUERIES = [
+    ("get_cases_by_date", "SELECT * FROM {table} WHERE upcoming_date = %s", ("2000-01-01",)),
+    ("get_cases_between", "SELECT * FROM {table} WHERE upcoming_date BETWEEN %s AND %s", ("2000-01-01", "2000-01-07")),
+    ("get_pending_cases", "SELECT * FROM {table} WHERE upcoming_date <= %s", ("2000-01-01",)),
+    ("case_number_exists", "SELECT 1 FROM {table} WHERE case_number = %s AND location = %s", ("x", "x")),
+    ("search_by_case_number", "SELECT * FROM {table} WHERE case_number = %s", ("x",)),
+    ("search_by_case_title", "SELECT * FROM {table} WHERE case_title ILIKE %s", ("%abc%",)),
+    ("search_by_company_name", "SELECT * FROM {table} WHERE company_name ILIKE %s", ("%abc%",)),
+    ("search_cases", "SELECT id FROM {table} WHERE %s <%% claimant_advocate_name", ("abc",)),
+    ("search_cases", "SELECT id FROM {table} WHERE case_number ILIKE %s", ("abc%",)),
+    ("search_cases", "SELECT id FROM {table} WHERE claimant_advocate_mobile_number LIKE %s", ("%123%",)),
+    ("get_cause_list", "SELECT * FROM {table} WHERE updated_at >= %s", ("2000-01-01",)),
+    ("get_cases_heard_on", "SELECT * FROM {table} WHERE previous_dates @> ARRAY[%s::date]", ("2000-01-01",)),
+]
+
+
+def _sequential_scans(plan, table_name):
+    scans = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") == table_name:
+        scans.append(plan)
+    for child in plan.get("Plans", []):
+        scans.extend(_sequential_scans(child, table_name))
+    return scans
+
+
+def check_query_plans(table_name=None):
+    """EXPLAIN the hot Case queries and warn about any that cannot use an index.
+
+    Sequential scans are disabled for the check, so a Seq Scan in the plan
+    means no usable index exists rather than that the table is still small.
+    Returns the names of the offending queries.
+    """
+    table_name = table_name or config_loader.load_config().table_name
+    unindexed = []
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute("SET LOCAL enable_seqscan = off")
+        for name, query, params in HOT_QUERIES:
+            cur.execute("EXPLAIN (FORMAT JSON) " + query.format(table=table_name), params)
+            plan = cur.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            if _sequential_scans(plan[0]["Plan"], table_name):
+                logger.warning("Case query %s does a sequential scan on %s", name, table_name)
+                unindexed.append(name)
+        conn.rollback()
+    return unindexed
+
+
+_startup_lock = threading.Lock()
+_startup_done = False
+
+
+def ensure_schema():
+    """Run the configured startup schema steps once per process."""
+    global _startup_done
+    if _startup_done:
+        return
+    with _startup_lock:
+        if _startup_done:
+            return
+        settings = config_loader.load_config().section("schema")
+        # The SQLite backend creates its own schema on first connection
+        if config_loader.load_config().section("storage").get("backend", "postgresql") != "postgresql":
+            _startup_done = True
+            return
+        if settings.get("migrate_on_startup", False):
+            migrate()
+        if settings.get("check_query_plans_on_startup", False):
+            check_query_plans()
+        _startup_done = True
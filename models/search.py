@@ -0,0 +1,89 @@
+import re
+
+from .archive import cases_source
+from .database import get_connection
+from .records import case_select, fetch_records
+
+# Searchable fields, named after their config.json headers
+CASE_NUMBER = "Case Number"
+CASE_TITLE = "Case Title"
+ADVOCATE_NAME = "Claimant Advocate Name"
+MOBILE_NUMBER = "Claimant Advocate Mobile Number"
+SEARCH_FIELDS = (CASE_NUMBER, CASE_TITLE, ADVOCATE_NAME, MOBILE_NUMBER)
+
+# word_similarity cut-off for fuzzy name matches; pg_trgm's default of 0.6
+# rejects common one-letter typos in short party names.
+FUZZY_THRESHOLD = 0.4
+DEFAULT_LIMIT = 20
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _candidate_queries(table_name, fields, query):
+    """One indexed candidate query per field, each yielding (id, score)."""
+    candidates = []
+    if CASE_NUMBER in fields:
+        # An exact case number always outranks anything fuzzy
+        candidates.append(f"SELECT id, 2.0 AS score FROM {table_name} WHERE case_number = %(query)s")
+        candidates.append(f"SELECT id, 1.5 AS score FROM {table_name} WHERE case_number ILIKE %(prefix)s")
+    for field, column in ((CASE_TITLE, "case_title"), (ADVOCATE_NAME, "claimant_advocate_name")):
+        if field in fields:
+            candidates.append(f"""
+                SELECT id, word_similarity(%(query)s, {column}) AS score
+                FROM {table_name}
+                WHERE %(query)s <%% {column}
+            """)
+    digits = re.sub(r"\D", "", query)
+    # Fewer than three digits has no trigram to search on and matches everything
+    if MOBILE_NUMBER in fields and len(digits) >= 3:
+        candidates.append(f"""
+            SELECT id, 1.0 AS score
+            FROM {table_name}
+            WHERE claimant_advocate_mobile_number LIKE %(digits)s
+        """)
+    return candidates, digits
+
+
+def search_cases(query, table_name, fields=SEARCH_FIELDS, limit=DEFAULT_LIMIT, include_archived=False):
+    """Return up to `limit` case rows matching `query`, best match first.
+
+    Exact case numbers rank first, then case-number prefixes, then fuzzy
+    (typo tolerant) matches on title and advocate name by trigram word
+    similarity, and mobile numbers by digit substring. Archived (closed)
+    cases are only searched when `include_archived` is set.
+    """
+    query = query.strip()
+    if not query:
+        return []
+    candidates, digits = _candidate_queries(table_name, fields, query)
+    if include_archived:
+        candidates += _candidate_queries(f"{table_name}_archive", fields, query)[0]
+    if not candidates:
+        return []
+    search_query = f"""
+        WITH matches AS (
+            {" UNION ALL ".join(candidates)}
+        ), ranked AS (
+            SELECT id, max(score) AS score
+            FROM matches
+            GROUP BY id
+            ORDER BY score DESC, id
+            LIMIT %(limit)s
+        )
+        SELECT {case_select("c")}
+        FROM ranked
+        JOIN {cases_source(table_name, include_archived)} AS c USING (id)
+        ORDER BY ranked.score DESC, c.id
+    """
+    params = {
+        "query": query,
+        "prefix": _escape_like(query) + "%",
+        "digits": "%" + digits + "%",
+        "limit": limit,
+    }
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute("SET LOCAL pg_trgm.word_similarity_threshold = %s", (FUZZY_THRESHOLD,))
+        cur.execute(search_query, params)
+        return fetch_records(cur)
@@ -0,0 +1,505 @@
+import json
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import config_loader
+from . import cache
+from .case import Case
+from .dashboard import HEARING_LOAD_DAYS, group_counts
+from .records import CASE_COLUMNS, CASE_SELECT, CaseRecord
+from .schema import SUMMARY_DIMENSIONS
+from .search import CASE_NUMBER, CASE_TITLE, ADVOCATE_NAME, MOBILE_NUMBER, SEARCH_FIELDS, FUZZY_THRESHOLD, DEFAULT_LIMIT
+
+# The same columns and constraints as the PostgreSQL table. Dates are ISO
+# text and previous_dates a sorted JSON array of ISO dates.
+_CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        case_number TEXT NOT NULL,
+        case_title TEXT NOT NULL,
+        case_type TEXT,
+        location TEXT NOT NULL,
+        company_name TEXT,
+        upcoming_date TEXT,
+        previous_dates TEXT NOT NULL DEFAULT '[]',
+        stage TEXT,
+        remarks TEXT,
+        status TEXT,
+        claimant_advocate_name TEXT,
+        claimant_advocate_mobile_number TEXT,
+        version INTEGER NOT NULL DEFAULT 1,
+        UNIQUE (case_number, location)
+    )
+"""
+
+# Counterparts of the PostgreSQL indexes; NOCASE collation lets the
+# case-insensitive LIKE prefix searches use them.
+_CREATE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS {table}_upcoming_date_idx ON {table} (upcoming_date, id)",
+    "CREATE INDEX IF NOT EXISTS {table}_case_number_nocase ON {table} (case_number COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS {table}_case_title_nocase ON {table} (case_title COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS {table}_company_name_nocase ON {table} (company_name COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS {table}_advocate_name_nocase ON {table} (claimant_advocate_name COLLATE NOCASE)",
+)
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+def _settings():
+    settings = {"sqlite_path": "advocate_diary.db", "busy_timeout_ms": 5000}
+    settings.update(config_loader.load_config().section("storage"))
+    return settings
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {int(_settings()['busy_timeout_ms'])}")
+    conn.create_function("word_similarity", 2, word_similarity, deterministic=True)
+    return conn
+
+
+def ensure_schema(conn, table_name):
+    with _schema_lock:
+        if table_name in _schema_ready:
+            return
+        conn.execute(_CREATE_TABLE.format(table=table_name))
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")}
+        if "version" not in columns:
+            conn.execute(f"ALTER TABLE {table_name} ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        for statement in _CREATE_INDEXES:
+            conn.execute(statement.format(table=table_name))
+        _schema_ready.add(table_name)
+
+
+@contextmanager
+def get_connection(table_name="case_records", write=False):
+    """This thread's SQLite connection inside a transaction.
+
+    Writers take the database write lock up front (BEGIN IMMEDIATE) so a
+    read-then-update cannot interleave with another writer. Commits on
+    success and rolls back on any exception (BaseException included), like
+    database.get_connection.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _connect(_settings()["sqlite_path"])
+    ensure_schema(conn, table_name)
+    conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        # Including GeneratorExit from a generator closed mid-iteration, which
+        # would otherwise leave this thread's connection inside a transaction
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _iso(value):
+    return None if value is None else value.isoformat()[:10]
+
+
+def _record(row):
+    values = dict(zip(CASE_COLUMNS, row))
+    if values["upcoming_date"] is not None:
+        values["upcoming_date"] = date.fromisoformat(values["upcoming_date"])
+    values["previous_dates"] = [date.fromisoformat(day) for day in json.loads(values["previous_dates"] or "[]")]
+    return CaseRecord(**values)
+
+
+def _records(cursor):
+    return [_record(row) for row in cursor.fetchall()]
+
+
+def _trigrams(text):
+    # pg_trgm's extraction: lower-cased alphanumeric words, each padded with
+    # two spaces in front and one behind
+    grams = set()
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def word_similarity(query, text):
+    """pg_trgm word_similarity: the best share of the query's trigrams found in a run of words of `text`."""
+    if not query or not text:
+        return 0.0
+    query_grams = _trigrams(query)
+    if not query_grams:
+        return 0.0
+    words = re.findall(r"[^\W_]+", text.lower())
+    span = len(re.findall(r"[^\W_]+", query)) + 1
+    best = 0
+    for start in range(len(words)):
+        for end in range(start + 1, min(len(words), start + span) + 1):
+            best = max(best, len(query_grams & _trigrams(" ".join(words[start:end]))))
+    return best / len(query_grams)
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class SQLiteCase:
+    """models.case.Case on the embedded SQLite database."""
+
+    @staticmethod
+    def add_case(case_data, table_name="case_records"):
+        with get_connection(table_name, write=True) as conn:
+            row = conn.execute(f"""
+                INSERT INTO {table_name} (
+                    case_number, case_title, case_type, location, company_name,
+                    upcoming_date, stage, remarks, status,
+                    claimant_advocate_name, claimant_advocate_mobile_number
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (case_number, location) DO NOTHING
+                RETURNING {CASE_SELECT}
+            """, (
+                case_data["case_number"], case_data["case_title"], case_data["case_type"], case_data["location"],
+                case_data["company_name"], _iso(case_data["upcoming_date"]), case_data["stage"], case_data["remarks"],
+                case_data["status"], case_data["claimant_advocate_name"], case_data["claimant_advocate_mobile_number"]
+            )).fetchone()
+        if row is None:
+            return None
+        cache.case_cache.invalidate(cache.tags_for_change(None, (case_data["upcoming_date"], case_data["company_name"])))
+        return _record(row)
+
+    @staticmethod
+    def case_number_exists(case_number, location, table_name):
+        with get_connection(table_name) as conn:
+            return conn.execute(
+                f"SELECT 1 FROM {table_name} WHERE case_number = ? AND location = ?", (case_number, location)
+            ).fetchone() is not None
+
+    @staticmethod
+    def search_by_case_number(case_number, table_name):
+        with get_connection(table_name) as conn:
+            return _records(conn.execute(f"SELECT {CASE_SELECT} FROM {table_name} WHERE case_number = ?", (case_number,)))
+
+    @staticmethod
+    def get_cases_by_ids(case_ids, table_name):
+        case_ids = list(case_ids)
+        with get_connection(table_name) as conn:
+            by_id = {case.id: case for case in _records(conn.execute(
+                f"SELECT {CASE_SELECT} FROM {table_name} WHERE id IN (SELECT value FROM json_each(?))",
+                (json.dumps(case_ids),)
+            ))}
+        return [by_id[case_id] for case_id in case_ids if case_id in by_id]
+
+    @staticmethod
+    def search_by_case_title(case_title, table_name):
+        with get_connection(table_name) as conn:
+            return _records(conn.execute(
+                f"SELECT {CASE_SELECT} FROM {table_name} WHERE case_title LIKE ? ESCAPE '\\'",
+                ("%" + _escape_like(case_title) + "%",)
+            ))
+
+    @staticmethod
+    def get_cases_by_date(selected_date, table_name):
+        with get_connection(table_name) as conn:
+            return _records(conn.execute(
+                f"SELECT {CASE_SELECT} FROM {table_name} WHERE upcoming_date = ?", (_iso(selected_date),)
+            ))
+
+    @staticmethod
+    def get_cases_between(start_date, end_date, table_name):
+        with get_connection(table_name) as conn:
+            return _records(conn.execute(
+                f"SELECT {CASE_SELECT} FROM {table_name} WHERE upcoming_date BETWEEN ? AND ? ORDER BY upcoming_date, id",
+                (_iso(start_date), _iso(end_date))
+            ))
+
+    @staticmethod
+    def get_cases_heard_on(hearing_date, table_name):
+        with get_connection(table_name) as conn:
+            return _records(conn.execute(f"""
+                SELECT {CASE_SELECT} FROM {table_name}
+                WHERE EXISTS (SELECT 1 FROM json_each(previous_dates) WHERE value = ?)
+            """, (_iso(hearing_date),)))
+
+    @staticmethod
+    def get_adjournment_counts(table_name):
+        with get_connection(table_name) as conn:
+            return conn.execute(f"""
+                SELECT id, case_number, json_array_length(previous_dates) AS adjournments
+                FROM {table_name}
+                ORDER BY adjournments DESC
+            """).fetchall()
+
+    @staticmethod
+    def get_todays_case_list(table_name):
+        return SQLiteCase.get_cases_by_date(date.today(), table_name)
+
+    @staticmethod
+    def get_pending_cases(table_name):
+        with get_connection(table_name) as conn:
+            return _records(conn.execute(
+                f"SELECT {CASE_SELECT} FROM {table_name} WHERE upcoming_date <= ?", (_iso(date.today()),)
+            ))
+
+    @staticmethod
+    def count_pending_cases(table_name):
+        with get_connection(table_name) as conn:
+            return conn.execute(
+                f"SELECT count(*) FROM {table_name} WHERE upcoming_date <= ?", (_iso(date.today()),)
+            ).fetchone()[0]
+
+    @staticmethod
+    def get_pending_cases_page(table_name, after=None, limit=50):
+        today = _iso(date.today())
+        with get_connection(table_name) as conn:
+            if after is None:
+                cursor = conn.execute(f"""
+                    SELECT {CASE_SELECT} FROM {table_name}
+                    WHERE upcoming_date <= ?
+                    ORDER BY upcoming_date, id
+                    LIMIT ?
+                """, (today, limit))
+            else:
+                cursor = conn.execute(f"""
+                    SELECT {CASE_SELECT} FROM {table_name}
+                    WHERE upcoming_date <= ? AND (upcoming_date, id) > (?, ?)
+                    ORDER BY upcoming_date, id
+                    LIMIT ?
+                """, (today, _iso(after[0]), after[1], limit))
+            return _records(cursor)
+
+    @staticmethod
+    def iter_pending_cases(table_name, batch_size=1000):
+        with get_connection(table_name) as conn:
+            cursor = conn.execute(f"""
+                SELECT {CASE_SELECT} FROM {table_name}
+                WHERE upcoming_date <= ?
+                ORDER BY upcoming_date, id
+            """, (_iso(date.today()),))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield _record(row)
+
+    @staticmethod
+    def _roll_forward(conn, table_name, case_id, upcoming_date, stage=None, set_stage=False, expected_version=None):
+        # Same rules as Case._ROLLED_HISTORY, applied under the write lock
+        row = conn.execute(
+            f"SELECT upcoming_date, previous_dates, company_name, stage, version FROM {table_name} WHERE id = ?",
+            (case_id,)
+        ).fetchone()
+        if row is None:
+            return "not_found", None, None
+        current, history, company_name, current_stage, version = row
+        if expected_version is not None and version != expected_version:
+            return "stale", None, None
+        history = json.loads(history)
+        new_date = _iso(upcoming_date)
+        date_changed = new_date != current
+        if date_changed and new_date in history:
+            return "date_in_history", None, None
+        if not date_changed and not set_stage:
+            return "date_in_history", None, None
+        if date_changed and current is not None and current not in history:
+            history = sorted([*history, current])
+        updated = conn.execute(f"""
+            UPDATE {table_name} SET previous_dates = ?, upcoming_date = ?, stage = ?, version = version + 1
+            WHERE id = ?
+            RETURNING {CASE_SELECT}
+        """, (json.dumps(history), new_date, stage if set_stage else current_stage, case_id)).fetchone()
+        return "updated", ((current, company_name), (new_date, company_name)), _record(updated)
+
+    @staticmethod
+    def update_case_data(case_id, upcoming_date, table_name, expected_version=None):
+        with get_connection(table_name, write=True) as conn:
+            outcome, change, row = SQLiteCase._roll_forward(
+                conn, table_name, case_id, upcoming_date, expected_version=expected_version
+            )
+        if change is not None:
+            cache.case_cache.invalidate(cache.tags_for_change(*change))
+        return Case._UPDATE_MESSAGES[outcome], row
+
+    @staticmethod
+    def update_cases_batch(changes, table_name):
+        outcomes, tags = {}, set()
+        with get_connection(table_name, write=True) as conn:
+            for case_id, upcoming_date, stage, version in changes:
+                outcome, change, row = SQLiteCase._roll_forward(
+                    conn, table_name, case_id, upcoming_date, stage, set_stage=True, expected_version=version
+                )
+                outcomes[case_id] = (Case._UPDATE_MESSAGES[outcome], row)
+                if change is not None:
+                    tags |= cache.tags_for_change(*change)
+        cache.case_cache.invalidate(tags)
+        return outcomes
+
+    @staticmethod
+    def search_by_company_name(company_name, table_name):
+        with get_connection(table_name) as conn:
+            return _records(conn.execute(
+                f"SELECT {CASE_SELECT} FROM {table_name} WHERE company_name LIKE ? ESCAPE '\\'",
+                ("%" + _escape_like(company_name) + "%",)
+            ))
+
+    @staticmethod
+    def search_by_company_name_page(company_name, table_name, after_id=None, limit=50):
+        with get_connection(table_name) as conn:
+            return _records(conn.execute(f"""
+                SELECT {CASE_SELECT} FROM {table_name}
+                WHERE company_name LIKE ? ESCAPE '\\' AND id > ?
+                ORDER BY id
+                LIMIT ?
+            """, ("%" + _escape_like(company_name) + "%", after_id or 0, limit)))
+
+    @staticmethod
+    def get_case_by_number_or_title(search_query, table_name):
+        matches = search_cases(search_query, table_name, (CASE_NUMBER, CASE_TITLE), limit=1)
+        return matches[0] if matches else None
+
+    @staticmethod
+    def update_case(case_id, case_data, table_name, expected_version=None):
+        with get_connection(table_name, write=True) as conn:
+            before = conn.execute(
+                f"SELECT upcoming_date, company_name, version FROM {table_name} WHERE id = ?", (case_id,)
+            ).fetchone()
+            if before is None:
+                return Case._UPDATE_MESSAGES["not_found"], None
+            if expected_version is not None and before[2] != expected_version:
+                return Case._UPDATE_MESSAGES["stale"], None
+            row = conn.execute(f"""
+                UPDATE {table_name} SET
+                    case_number = ?, case_title = ?, case_type = ?, location = ?,
+                    company_name = ?, upcoming_date = ?, stage = ?, remarks = ?,
+                    status = ?, claimant_advocate_name = ?, claimant_advocate_mobile_number = ?,
+                    version = version + 1
+                WHERE id = ?
+                RETURNING {CASE_SELECT}
+            """, (
+                case_data["case_number"], case_data["case_title"], case_data["case_type"],
+                case_data["location"], case_data["company_name"], _iso(case_data["upcoming_date"]),
+                case_data["stage"], case_data["remarks"], case_data["status"],
+                case_data["claimant_advocate_name"], case_data["claimant_advocate_mobile_number"], case_id
+            )).fetchone()
+        cache.case_cache.invalidate(cache.tags_for_change(
+            (before[0], before[1]), (case_data["upcoming_date"], case_data["company_name"])
+        ))
+        return Case._UPDATE_MESSAGES["updated"], _record(row)
+
+
+def search_cases(query, table_name, fields=SEARCH_FIELDS, limit=DEFAULT_LIMIT, include_archived=False):
+    """models.search.search_cases on SQLite, with the same ranking.
+
+    SQLite installs do not archive cases, so `include_archived` changes nothing.
+    """
+    query = query.strip()
+    if not query:
+        return []
+    candidates, params = [], []
+    if CASE_NUMBER in fields:
+        candidates.append(f"SELECT id, 2.0 AS score FROM {table_name} WHERE case_number = ?")
+        candidates.append(f"SELECT id, 1.5 AS score FROM {table_name} WHERE case_number LIKE ? ESCAPE '\\'")
+        params += [query, _escape_like(query) + "%"]
+    for field, column in ((CASE_TITLE, "case_title"), (ADVOCATE_NAME, "claimant_advocate_name")):
+        if field in fields:
+            candidates.append(f"""
+                SELECT id, word_similarity(?, {column}) AS score
+                FROM {table_name}
+                WHERE word_similarity(?, {column}) >= ?
+            """)
+            params += [query, query, FUZZY_THRESHOLD]
+    digits = re.sub(r"\D", "", query)
+    if MOBILE_NUMBER in fields and len(digits) >= 3:
+        candidates.append(f"SELECT id, 1.0 AS score FROM {table_name} WHERE claimant_advocate_mobile_number LIKE ?")
+        params.append("%" + digits + "%")
+    if not candidates:
+        return []
+    select_list = ", ".join(f"c.{column}" for column in CASE_COLUMNS)
+    with get_connection(table_name) as conn:
+        return _records(conn.execute(f"""
+            WITH matches AS ({" UNION ALL ".join(candidates)}),
+            ranked AS (
+                SELECT id, max(score) AS score FROM matches GROUP BY id
+                ORDER BY score DESC, id LIMIT ?
+            )
+            SELECT {select_list}
+            FROM ranked JOIN {table_name} AS c USING (id)
+            ORDER BY ranked.score DESC, c.id
+        """, (*params, limit)))
+
+
+def changed_cases(table_name, since=None):
+    """models.case_index.changed_cases on SQLite.
+
+    The SQLite table has no updated_at column, so every call is a complete
+    read; on a local file that costs no network round trip.
+    """
+    with get_connection(table_name) as conn:
+        return None, _records(conn.execute(f"SELECT {CASE_SELECT} FROM {table_name}")), None
+
+
+def get_counts(table_name="case_records"):
+    # Small offices: aggregate directly instead of keeping summary tables
+    open_status = config_loader.load_config().open_status
+    with get_connection(table_name) as conn:
+        rows = []
+        for dimension in SUMMARY_DIMENSIONS:
+            rows += conn.execute(f"""
+                SELECT ?, COALESCE({dimension}, ''), count(*), sum(status = ?)
+                FROM {table_name}
+                GROUP BY 2
+                ORDER BY 3 DESC, 2
+            """, (dimension, open_status)).fetchall()
+    return group_counts(rows)
+
+
+def get_hearing_load(table_name="case_records", days=HEARING_LOAD_DAYS):
+    open_status = config_loader.load_config().open_status
+    today = date.today()
+    with get_connection(table_name) as conn:
+        rows = conn.execute(f"""
+            SELECT upcoming_date, count(*), sum(status = ?)
+            FROM {table_name}
+            WHERE upcoming_date BETWEEN ? AND ?
+            GROUP BY upcoming_date
+            ORDER BY upcoming_date
+        """, (open_status, _iso(today), _iso(today + timedelta(days=days)))).fetchall()
+    return [(date.fromisoformat(day), cases, open_cases) for day, cases, open_cases in rows]
+
+
+def get_overdue_count(table_name="case_records"):
+    open_status = config_loader.load_config().open_status
+    with get_connection(table_name) as conn:
+        return conn.execute(
+            f"SELECT count(*) FROM {table_name} WHERE upcoming_date < ? AND status = ?",
+            (_iso(date.today()), open_status)
+        ).fetchone()[0]
+
+
+_QUERIES = {
+    "counts": get_counts,
+    "hearing_load": get_hearing_load,
+    "overdue": get_overdue_count,
+    "todays_cases": lambda table_name: SQLiteCase.get_cases_by_date(date.today(), table_name),
+    "pending_count": SQLiteCase.count_pending_cases,
+}
+
+
+def fetch_all(names, table_name="case_records"):
+    # Local queries take well under a millisecond; running them in turn is
+    # cheaper than handing them to threads.
+    return {name: _QUERIES[name](table_name) for name in names}
+
+
+class SQLiteBackend:
+    """Case operations on an embedded SQLite file, for single-office installs and tests."""
+    name = "sqlite"
+    cases = SQLiteCase
+    search_cases = staticmethod(search_cases)
+    fetch_all = staticmethod(fetch_all)
+    changed_cases = staticmethod(changed_cases)
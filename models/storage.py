@@ -0,0 +1,29 @@
+import config_loader
+from . import async_queries, case_index, search
+from .case import Case
+
+BACKENDS = ("postgresql", "sqlite")
+
+
+class PostgresBackend:
+    """Case operations on PostgreSQL: models.case, models.search and the dashboard summary tables."""
+    name = "postgresql"
+    cases = Case
+    search_cases = staticmethod(search.search_cases)
+    fetch_all = staticmethod(async_queries.fetch_all)
+    changed_cases = staticmethod(case_index.changed_cases)
+
+
+def backend_name():
+    name = config_loader.load_config().section("storage").get("backend", "postgresql")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend '{name}' in config.json, expected one of {', '.join(BACKENDS)}.")
+    return name
+
+
+def get_backend():
+    """The backend selected by storage.backend in config.json."""
+    if backend_name() == "sqlite":
+        from .sqlite_store import SQLiteBackend
+        return SQLiteBackend
+    return PostgresBackend
@@ -0,0 +1,40 @@
+import io
+from datetime import date
+
+import pytest
+
+from models import case_import
+
+CASE_BOOK = (
+    "Case Number,Case Title,Location,Upcoming Date,Previous Dates,Remarks,Company Name\n"
+    "1,A vs B,Kannauj,18/10/2026,,,\n"
+    "2,C vs D,Kannauj,2026-10-19,\"2026-01-02, 2026-02-03\",Adjourned,BAGIC\n"
+)
+
+
+def read(text):
+    return case_import.read_case_book(io.StringIO(text), "cases.csv")
+
+
+def test_blank_cells_are_none():
+    valid, errors = case_import.validate_case_book(read(CASE_BOOK))
+    assert errors == []
+    first = valid.iloc[0]
+    assert first["remarks"] is None
+    assert first["company_name"] is None
+    assert first["previous_dates"] == "{}"
+
+
+def test_iso_and_day_first_dates_mix():
+    valid, _ = case_import.validate_case_book(read(CASE_BOOK))
+    assert list(valid["upcoming_date"]) == [date(2026, 10, 18), date(2026, 10, 19)]
+
+
+def test_invalid_date_is_reported():
+    _, errors = case_import.validate_case_book(read(CASE_BOOK + "3,E vs F,Kannauj,31/02/2026,,,\n"))
+    assert errors == [(4, "upcoming_date is not a valid date")]
+
+
+def test_unreadable_workbook_is_a_value_error():
+    with pytest.raises(ValueError):
+        case_import.read_case_book(io.BytesIO(b"PK\x03\x04 not a workbook"), "cases.xlsx")
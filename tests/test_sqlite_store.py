@@ -0,0 +1,95 @@
+from datetime import date, timedelta
+
+import pytest
+
+from models import sqlite_store
+from models.case import Case
+from models.sqlite_store import SQLiteCase
+
+TABLE = "case_records"
+TODAY = date.today()
+
+
+@pytest.fixture(autouse=True)
+def database(tmp_path, monkeypatch):
+    path = str(tmp_path / "diary.db")
+    monkeypatch.setattr(sqlite_store, "_settings", lambda: {"sqlite_path": path, "busy_timeout_ms": 5000})
+    monkeypatch.setattr(sqlite_store, "_local", sqlite_store.threading.local())
+    monkeypatch.setattr(sqlite_store, "_schema_ready", set())
+    yield
+    conn = getattr(sqlite_store._local, "conn", None)
+    if conn is not None:
+        conn.close()
+
+
+def add(case_number, case_title="A vs B", upcoming_date=TODAY, status="OPEN", **fields):
+    case_data = {
+        "case_number": case_number, "case_title": case_title, "case_type": "MACT", "location": "Kannauj",
+        "company_name": "BAGIC", "upcoming_date": upcoming_date, "stage": "Evidence", "remarks": None,
+        "status": status, "claimant_advocate_name": None, "claimant_advocate_mobile_number": None,
+    }
+    case_data.update(fields)
+    return SQLiteCase.add_case(case_data, TABLE)
+
+
+def test_duplicate_case_number_is_rejected():
+    assert add("101") is not None
+    assert add("101", "Someone else") is None
+    assert add("101", location="Kanpur Nagar - North") is not None
+
+
+def test_update_moves_old_date_into_previous_dates():
+    case = add("101", upcoming_date=date(2026, 10, 1))
+    message, row = SQLiteCase.update_case_data(case.id, date(2026, 11, 1), TABLE)
+    assert message == Case._UPDATE_MESSAGES["updated"]
+    assert row.upcoming_date == date(2026, 11, 1)
+    assert row.previous_dates == [date(2026, 10, 1)]
+    assert row.version == case.version + 1
+
+    message, row = SQLiteCase.update_case_data(case.id, date(2026, 10, 1), TABLE)
+    assert message == Case._UPDATE_MESSAGES["date_in_history"]
+    assert row is None
+
+
+def test_stale_version_is_reported():
+    case = add("101")
+    SQLiteCase.update_case_data(case.id, TODAY + timedelta(days=7), TABLE)
+    message, row = SQLiteCase.update_case_data(case.id, TODAY + timedelta(days=14), TABLE, expected_version=case.version)
+    assert message == Case._UPDATE_MESSAGES["stale"]
+    assert row is None
+    assert SQLiteCase.search_by_case_number("101", TABLE)[0].upcoming_date == TODAY + timedelta(days=7)
+
+
+def test_batch_updates_fresh_rows_and_reports_stale_ones():
+    fresh, stale = add("101"), add("102")
+    SQLiteCase.update_case_data(stale.id, TODAY + timedelta(days=1), TABLE)
+    outcomes = SQLiteCase.update_cases_batch([
+        (fresh.id, TODAY + timedelta(days=7), "Arguments", fresh.version),
+        (stale.id, TODAY + timedelta(days=7), "Arguments", stale.version),
+    ], TABLE)
+    message, row = outcomes[fresh.id]
+    assert message == Case._UPDATE_MESSAGES["updated"]
+    assert (row.upcoming_date, row.stage, row.previous_dates) == (TODAY + timedelta(days=7), "Arguments", [TODAY])
+    assert outcomes[stale.id] == (Case._UPDATE_MESSAGES["stale"], None)
+
+
+def test_search_ranks_exact_case_number_first():
+    add("1201", "Ramesh vs Oriental")
+    add("120", "Suresh vs National")
+    add("77", "Mahesh vs Ramesh Kumar")
+    matches = sqlite_store.search_cases("120", TABLE)
+    assert [case.case_number for case in matches] == ["120", "1201"]
+    matches = sqlite_store.search_cases("ramesh", TABLE)
+    assert {case.case_number for case in matches} == {"1201", "77"}
+
+
+def test_dashboard_counts():
+    add("101")
+    add("102", status="AWARD", company_name=None)
+    add("103", upcoming_date=TODAY - timedelta(days=3))
+    add("104", upcoming_date=TODAY + timedelta(days=2), status="DD")
+    counts = sqlite_store.get_counts(TABLE)
+    assert counts["status"] == [("OPEN", 2, 2), ("AWARD", 1, 0), ("DD", 1, 0)]
+    assert counts["company_name"] == [("BAGIC", 3, 2), ("", 1, 0)]
+    assert sqlite_store.get_hearing_load(TABLE) == [(TODAY, 2, 1), (TODAY + timedelta(days=2), 1, 0)]
+    assert sqlite_store.get_overdue_count(TABLE) == 1
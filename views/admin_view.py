@@ -0,0 +1,71 @@
+import hmac
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from models import instrumentation
+
+
+def _is_admin():
+    if st.session_state.get("is_admin"):
+        return True
+    try:
+        admin_password = st.secrets.get("admin", {}).get("password")
+    except FileNotFoundError:
+        # No secrets.toml at all, e.g. a SQLite install
+        admin_password = None
+    if not admin_password:
+        st.error("No admin password is configured in secrets ([admin] password).")
+        return False
+    password = st.text_input("Admin password", type="password")
+    if password and hmac.compare_digest(password, admin_password):
+        st.session_state.is_admin = True
+        st.rerun(scope="fragment")
+    elif password:
+        st.error("Incorrect password.")
+    return False
+
+
+def performance_panel():
+    st.header("Performance")
+    if not _is_admin():
+        return
+    if not instrumentation.enabled:
+        st.info("Query instrumentation is off. Set instrumentation.enabled in config.json and restart the app.")
+        return
+
+    stats = instrumentation.snapshot()
+    if st.button("Reset statistics"):
+        instrumentation.reset()
+        st.rerun(scope="fragment")
+
+    st.subheader("Pages")
+    if stats["pages"]:
+        pages = pd.DataFrame(stats["pages"]).sort_values("p95_ms", ascending=False)
+        st.dataframe(pages, hide_index=True)
+    else:
+        st.write("No page renders recorded yet.")
+
+    st.subheader("Reruns")
+    st.caption("Server time of whole-app runs versus page-fragment reruns.")
+    if stats["reruns"]:
+        reruns = pd.DataFrame(stats["reruns"]).sort_values(["page", "scope"])
+        st.dataframe(reruns, hide_index=True)
+    else:
+        st.write("No reruns recorded yet.")
+
+    st.subheader("Queries")
+    if stats["queries"]:
+        queries = pd.DataFrame(stats["queries"]).sort_values("p95_ms", ascending=False)
+        st.dataframe(queries, hide_index=True)
+    else:
+        st.write("No queries recorded yet.")
+
+    st.subheader(f"Slow queries (over {stats['slow_query_ms']} ms)")
+    if stats["slow_queries"]:
+        slow = pd.DataFrame(reversed(stats["slow_queries"]))
+        slow["at"] = slow["at"].map(lambda ts: datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"))
+        st.dataframe(slow, hide_index=True)
+    else:
+        st.write("No slow queries recorded.")
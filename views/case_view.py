@@ -1,10 +1,14 @@
 import streamlit as st
-from datetime import date
+from datetime import date, timedelta
 from controllers.case_controller import CaseController
-from models.case import Case
+from models import case_export, case_import, case_index, search
+import os
+import tempfile
 import pandas as pd
+import psycopg2
 import config_loader
-from views.utils import update_cases_and_previous_dates
+from models.records import display_columns, records_to_frame
+from views.utils import editor_column_config, editor_columns, editor_frame, keyset_pages, shared_frame, update_cases_and_previous_dates
 
 
 class CaseView:
@@ -23,17 +27,18 @@ class CaseView:
             else:
                 validation_errors.pop(field_name, None)
 
+        config = config_loader.load_config()
         col1, col2 = st.columns(2)
 
         with col1:
             case_number = st.text_input("Case Number", max_chars=10, key="case_number")
             case_title = st.text_input("Case Title", max_chars=255, key="case_title")
-            case_type = st.selectbox("Case Type", config_loader.load_config()['case_types'], key="case_type")
-            location = st.selectbox("Location", config_loader.load_config()['locations'], key="location")
-            company_name = st.selectbox("Company Name", config_loader.load_config()['company_names'], key="company_name")
+            case_type = st.selectbox("Case Type", config.case_types, key="case_type")
+            location = st.selectbox("Location", config.locations, key="location")
+            company_name = st.selectbox("Company Name", config.company_names, key="company_name")
             upcoming_date = st.date_input("Upcoming Date", key="upcoming_date")
             stage = st.text_input("Stage", max_chars=50, key="stage")
-            status = st.selectbox("Status", config_loader.load_config()['statuses'], key="status")
+            status = st.selectbox("Status", config.statuses, key="status")
             claimant_advocate_name = st.text_input("Claimant Advocate Name", max_chars=100, key="claimant_advocate_name")
             claimant_advocate_mobile_number = st.text_input("Claimant Advocate Mobile Number", max_chars=15, key="claimant_advocate_mobile_number")
             remarks = st.text_area("Remarks", key="remarks")
@@ -54,62 +59,183 @@ class CaseView:
             else:
                 # Show spinner while case is being added
                 with st.spinner("Adding new case..."):
-                    if self.controller.add_new_case(case_number, location):
-                        st.error("Case number already exists for the selected location")
-                    else:
-                        case_data = {
-                            "case_number": case_number,
-                            "case_title": case_title,
-                            "case_type": case_type,
-                            "location": location,
-                            "company_name": company_name,
-                            "upcoming_date": upcoming_date,
-                            "stage": stage,
-                            "remarks": remarks,
-                            "status": status,
-                            "claimant_advocate_name": claimant_advocate_name,
-                            "claimant_advocate_mobile_number": claimant_advocate_mobile_number
-                        }
-                        try:
-                            Case.add_case(case_data)
+                    case_data = {
+                        "case_number": case_number,
+                        "case_title": case_title,
+                        "case_type": case_type,
+                        "location": location,
+                        "company_name": company_name,
+                        "upcoming_date": upcoming_date,
+                        "stage": stage,
+                        "remarks": remarks,
+                        "status": status,
+                        "claimant_advocate_name": claimant_advocate_name,
+                        "claimant_advocate_mobile_number": claimant_advocate_mobile_number
+                    }
+                    try:
+                        if self.controller.add_new_case(case_data) is None:
+                            st.error("Case number already exists for the selected location")
+                        else:
                             st.success("Case added successfully!")
-                        except Exception as e:
-                            st.error(f"Error adding case: {e}")
+                    except Exception as e:
+                        st.error(f"Error adding case: {e}")
+
+    def import_cases(self):
+        st.header("Import Cases")
+        if self.controller.backend.name != "postgresql":
+            st.info("Bulk import needs the PostgreSQL storage backend.")
+            return
+        st.write("Upload a CSV or Excel file with the same column headers as the case lists. "
+                 "Case Type, Location, Company Name and Status must use the configured values.")
+        uploaded = st.file_uploader("Case book", type=["csv", "xlsx"])
+        if uploaded is None:
+            return
+
+        try:
+            frame = case_import.read_case_book(uploaded, uploaded.name)
+        except (ValueError, UnicodeDecodeError, pd.errors.ParserError) as e:
+            # Not a readable CSV/Excel file: bad encoding, broken rows or a corrupt workbook
+            st.error(f"Could not read {uploaded.name}: {e}")
+            return
+        valid, errors = case_import.validate_case_book(frame)
+        st.write(f"{len(frame)} rows read, {len(valid)} valid, {len(errors)} with errors.")
+        if errors:
+            st.dataframe(pd.DataFrame(errors, columns=["Row", "Problem"]), hide_index=True)
+
+        if len(valid) and st.button(f"Import {len(valid)} valid rows"):
+            with st.spinner("Importing cases..."):
+                try:
+                    inserted, existing = case_import.load_case_book(valid, self.controller.table_name)
+                except Exception as e:
+                    st.error(f"Error importing cases, nothing was saved: {e}")
+                    return
+            st.success(f"{inserted} case(s) imported.")
+            if existing:
+                st.warning(f"{len(existing)} case(s) already existed and were skipped.")
+                st.dataframe(pd.DataFrame(existing, columns=["Case Number", "Location"]), hide_index=True)
+
+    def export_cases(self):
+        st.header("Export Cases")
+        if self.controller.backend.name != "postgresql":
+            st.info("Export needs the PostgreSQL storage backend.")
+            return
+        scopes = {"Cases on a date": "date", "Date range": "range", "Pending cases": "pending", "All cases": "all"}
+        scope = scopes[st.selectbox("Export", list(scopes))]
+        dates = ()
+        if scope == "date":
+            dates = (st.date_input("Date", value=date.today()),)
+        elif scope == "range":
+            start_col, end_col = st.columns(2)
+            dates = (start_col.date_input("From", value=date.today()), end_col.date_input("To", value=date.today()))
+        file_format = st.radio("Format", case_export.FORMATS, format_func=str.upper, horizontal=True)
+        include_archived = st.checkbox("Include archived (closed) cases")
+
+        table_name = self.controller.table_name
+        request = (scope, dates, file_format, include_archived)
+        # (request, path, size) of the file prepared for this session
+        prepared = st.session_state.get("prepared_export")
+        if prepared is not None and (prepared[0] != request or not os.path.exists(prepared[1])):
+            _remove_export(st.session_state.pop("prepared_export")[1])
+            prepared = None
+
+        if st.button("Prepare export"):
+            if prepared is not None:
+                _remove_export(st.session_state.pop("prepared_export")[1])
+                prepared = None
+            # Rows stream from the database into a file on disk (no DataFrame)
+            export_file = tempfile.NamedTemporaryFile(prefix="case_export_", suffix=f".{file_format}", delete=False)
+            try:
+                with export_file, st.spinner("Preparing the export..."):
+                    case_export.export_cases(export_file, scope, file_format, dates, table_name, include_archived)
+            except (psycopg2.Error, OSError, RuntimeError) as e:
+                # RuntimeError: Parquet without the optional pyarrow package
+                _remove_export(export_file.name)
+                st.error(f"Error preparing the export: {e}")
+                return
+            prepared = (request, export_file.name, os.path.getsize(export_file.name))
+            st.session_state.prepared_export = prepared
+
+        if prepared is None:
+            return
+        _, path, size = prepared
+        max_bytes = int(config_loader.load_config().section("export").get("max_download_mb", 200)) * 1024 * 1024
+        if size > max_bytes:
+            st.warning(
+                f"The export is {size / 1024 / 1024:.0f} MB, more than the {max_bytes // 1024 // 1024} MB "
+                "that can be downloaded here; use `python cli.py export` instead."
+            )
+            return
+
+        def read_export():
+            # Read only when Download is clicked; Streamlit holds the bytes for
+            # that one download instead of for the whole session
+            with open(path, "rb") as exported:
+                return exported.read()
+
+        st.download_button(
+            f"Download ({size / 1024:,.0f} KB)",
+            data=read_export,
+            file_name=f"cases_{scope}_{'_'.join(str(d) for d in dates) or date.today()}.{file_format}",
+            mime="text/csv" if file_format == "csv" else "application/octet-stream"
+        )
 
     def update_case(self):
         st.header("Update Case")
-        search_query = st.text_input("Enter Case Number or Case Title")
-        
-        if st.button("Search"):
-            case = self.controller.get_case_by_number_or_title(search_query)
-            if case:
-                st.session_state.case_to_update = case
-                st.success("Case found. Please update the fields below.")
+        cases = self.controller.case_labels()
+        labels = dict(cases)
+        # The browser filters these labels as you type; only the picked row is read
+        case_id = st.selectbox(
+            "Case", [case_id for case_id, _ in cases], index=None, format_func=labels.get,
+            placeholder="Type a case number, title or advocate name", key="update_case_pick"
+        )
+        search_query = st.text_input("Not in the list? Search case numbers and titles allowing for spelling mistakes")
+        if search_query:
+            searched_query, matches = st.session_state.get('update_matches', (None, []))
+            if search_query != searched_query:
+                matches = self.controller.find_cases_by_number_or_title(search_query)
+                st.session_state.update_matches = (search_query, matches)
+            if not matches:
+                st.error("Case not found.")
+                case_id = None
             else:
+                # Ranked best match first, so the default selection is the likeliest case
+                choice = st.selectbox("Matching cases", range(len(matches)), format_func=lambda i: case_index.label(matches[i]))
+                case_id = matches[choice].id
+                st.session_state.case_to_update = matches[choice]
+
+        if case_id is None:
+            st.session_state.pop('case_to_update', None)
+        elif getattr(st.session_state.get('case_to_update'), "id", None) != case_id:
+            loaded = self.controller.get_cases_by_ids([case_id])
+            if loaded:
+                st.session_state.case_to_update = loaded[0]
+            else:
+                st.session_state.pop('case_to_update', None)
                 st.error("Case not found.")
 
         if 'case_to_update' in st.session_state:
             case = st.session_state.case_to_update
-            case_id = case[0]  # Assuming the ID is the first column
+            case_id = case.id
 
+            config = config_loader.load_config()
             col1, col2 = st.columns(2)
 
             with col1:
-                case_number = st.text_input("Case Number", value=case[1], max_chars=10)
-                case_title = st.text_input("Case Title", value=case[2], max_chars=255)
-                case_type = st.selectbox("Case Type", config_loader.load_config()['case_types'], index=config_loader.load_config()['case_types'].index(case[3]) if case[3] in config_loader.load_config()['case_types'] else 0)
-                location = st.selectbox("Location", config_loader.load_config()['locations'], index=config_loader.load_config()['locations'].index(case[4]) if case[4] in config_loader.load_config()['locations'] else 0)
-                company_name = st.selectbox("Company Name", config_loader.load_config()['company_names'], index=config_loader.load_config()['company_names'].index(case[5]) if case[5] in config_loader.load_config()['company_names'] else 0)
-                upcoming_date = st.date_input("Upcoming Date", value=case[6] if case[6] else None)
-                stage = st.text_input("Stage", value=case[8], max_chars=50)                
+                case_number = st.text_input("Case Number", value=case.case_number, max_chars=10)
+                case_title = st.text_input("Case Title", value=case.case_title, max_chars=255)
+                case_type = st.selectbox("Case Type", config.case_types, index=config.index_of("case_types", case.case_type))
+                location = st.selectbox("Location", config.locations, index=config.index_of("locations", case.location))
+                company_name = st.selectbox("Company Name", config.company_names, index=config.index_of("company_names", case.company_name))
+                upcoming_date = st.date_input("Upcoming Date", value=case.upcoming_date if case.upcoming_date else None)
+                # May be left out of the case lists (see listHeaders), so shown with the full record here
+                st.caption("Previous dates: " + (", ".join(str(day) for day in case.previous_dates) or "none"))
+                stage = st.text_input("Stage", value=case.stage, max_chars=50)                
                 # Handle the case where status might be empty or not in the list
-                statuses = config_loader.load_config()['statuses']
-                status_index = statuses.index(case[10]) if case[10] in statuses else 0
-                status = st.selectbox("Status", statuses, index=status_index)
+                status = st.selectbox("Status", config.statuses, index=config.index_of("statuses", case.status))
                 
-                claimant_advocate_name = st.text_input("Claimant Advocate Name", value=case[11], max_chars=100)
-                claimant_advocate_mobile_number = st.text_input("Claimant Advocate Mobile Number", value=case[12], max_chars=15)
-                remarks = st.text_area("Remarks", value=case[9])
+                claimant_advocate_name = st.text_input("Claimant Advocate Name", value=case.claimant_advocate_name, max_chars=100)
+                claimant_advocate_mobile_number = st.text_input("Claimant Advocate Mobile Number", value=case.claimant_advocate_mobile_number, max_chars=15)
+                remarks = st.text_area("Remarks", value=case.remarks)
             if st.button("Update"):
                 with st.spinner("Updating the case..."):
                     case_data = {
@@ -126,34 +252,92 @@ class CaseView:
                         "claimant_advocate_mobile_number": claimant_advocate_mobile_number
                     }
                     try:
-                        self.controller.update_case(case_id, case_data)
-                        st.success("Case updated successfully!")
+                        message, updated = self.controller.update_case(case_id, case_data, case.version)
                     except Exception as e:
                         st.error(f"Error updating case: {e}")
+                    else:
+                        if updated is None:
+                            st.warning(message)
+                        else:
+                            st.success("Case updated successfully!")
+                            # Keep editing the saved row (and its new version);
+                            # the index already has it
+                            if search_query and matches:
+                                matches[choice] = updated
+                            st.session_state.case_to_update = updated
 
     def search_case(self):
         st.header("Search Case")
-        search_criteria = st.selectbox("Search Case By", ["Case Number", "Case Title"])
-        search_query = st.text_input(f"Enter {search_criteria}", "")
+        search_criteria = st.selectbox("Search Case By", ["Any", *search.SEARCH_FIELDS])
+        search_query = st.text_input(f"Enter {'Search Term' if search_criteria == 'Any' else search_criteria}", "")
+        include_archived = st.checkbox("Include archived (closed) cases")
 
         if st.button("Search"):
-            cases = self.controller.search_case(search_criteria, search_query)
+            cases = self.controller.search_case(search_criteria, search_query, include_archived)
             if not cases:
                 st.write("No cases found.")
             else:
-                df_cases = pd.DataFrame(cases, columns=config_loader.load_config()['headers'])
-                st.dataframe(df_cases)
+                df_cases = shared_frame(("search", search_criteria, search_query, include_archived), cases, display_columns())
+                st.dataframe(df_cases, hide_index=True)
+        elif search_query:
+            fields = case_index.INDEXED_FIELDS if search_criteria == "Any" else (search_criteria,)
+            suggestions = self.controller.suggest_cases(search_query, tuple(fields))
+            if suggestions:
+                # Shown once the query is entered, not per keystroke
+                st.caption("Prefix matches (press Search for spelling-tolerant matches)")
+                cases = self.controller.get_cases_by_ids([case_id for case_id, _ in suggestions])
+                st.dataframe(records_to_frame(cases, display_columns()), hide_index=True)
 
     def search_cases_by_company_name(self):
         st.header("Search Cases By Company Name")
         company_name = st.selectbox("Company Name",
-                                    config_loader.load_config()['company_names'], key="company_name")
-        cases = self.controller.search_case_by_company(company_name)
+                                    config_loader.load_config().company_names, key="company_name")
+        cases = keyset_pages(
+            f"company_cases_{company_name}",
+            lambda after, limit: self.controller.search_case_by_company_page(company_name, after, limit),
+            lambda case: case.id
+        )
         if not cases:
            st.write("No cases found.")
         else:
-           df_cases = pd.DataFrame(cases, columns=config_loader.load_config()['headers'])
-           st.dataframe(df_cases)
+           df_cases = shared_frame(("company_page", company_name, cases[0].id), cases, display_columns())
+           st.dataframe(df_cases, hide_index=True)
+
+    def dashboard(self):
+        summary = self.controller.get_dashboard()
+        counts = summary["counts"]
+        status_counts = counts.get("status", [])
+        today = date.today()
+        todays_hearings = next((cases for day, cases, _ in summary["hearing_load"] if day == today), 0)
+
+        col1, col2, col3, col4, col5 = st.columns(5)
+        col1.metric("Total Cases", sum(cases for _, cases, _ in status_counts))
+        col2.metric("Open Cases", sum(open_cases for _, _, open_cases in status_counts))
+        col3.metric("Pending", summary["pending_count"])
+        col4.metric("Overdue", summary["overdue"])
+        col5.metric("Hearings Today", todays_hearings)
+
+        left, right = st.columns(2)
+        for column, (dimension, title) in zip(
+            (left, right, left, right),
+            (("status", "By Status"), ("company_name", "By Company"),
+             ("location", "By Location"), ("case_type", "By Case Type"))
+        ):
+            with column:
+                st.subheader(title)
+                rows = counts.get(dimension, [])
+                if rows:
+                    chart = pd.DataFrame(rows, columns=[title, "Cases", "Open"]).set_index(title)
+                    st.bar_chart(chart["Cases"])
+                else:
+                    st.write("No cases yet.")
+
+        st.subheader("Hearings in the Next 30 Days")
+        if summary["hearing_load"]:
+            load = pd.DataFrame(summary["hearing_load"], columns=["Date", "Cases", "Open"]).set_index("Date")
+            st.bar_chart(load["Cases"])
+        else:
+            st.write("No hearings scheduled.")
 
     def todays_case_list(self):
         st.header("Today's Case List")
@@ -166,17 +350,18 @@ class CaseView:
                 if not cases:
                     st.write("No cases scheduled for today.")
                 else:
-                    df_cases = pd.DataFrame(cases, columns=config_loader.load_config()['headers'])
-                    st.session_state.df_value = df_cases
-        if "df_value" in st.session_state:
-            df_cases = st.session_state.df_value
+                    st.session_state.df_value = shared_frame(("todays_cases", date.today()), cases, editor_columns())
+                    st.session_state.df_date = date.today()
+        # df_value may hold another day's list from Cases by Date
+        if "df_value" in st.session_state and st.session_state.get("df_date") == date.today():
+            df_cases = editor_frame(st.session_state.df_value)
 
-            column_config = {col: st.column_config.Column(disabled=True) for col in df_cases.columns if
-                             col not in ["Upcoming Date", "Stage"]}
+            column_config = editor_column_config(df_cases)
 
             edited_df = st.data_editor(
                 df_cases,
                 num_rows="fixed",
+                hide_index=True,
                 column_config=column_config,
             )
             if st.button("Update Cases"):
@@ -188,36 +373,78 @@ class CaseView:
             selected_date = st.date_input("Select Date", value=pd.Timestamp.now().date())
             submit_button = st.form_submit_button("Get Cases")
 
-            # Fetch data if the button is clicked or if it's the current date
-            if submit_button or selected_date == pd.Timestamp.now().date():
+            # Fetch when asked or when the date differs from the loaded list;
+            # otherwise keep the list, with any saves patched into it
+            if submit_button or st.session_state.get("df_date") != selected_date:
                 cases = self.controller.get_cases_by_date(selected_date)
                 if not cases:
                     st.write(f"No cases found for {selected_date}.")
-                    if "df_value" in st.session_state:
-                        del st.session_state.df_value
+                    st.session_state.pop("df_value", None)
+                    st.session_state.pop("df_date", None)
                 else:
-                    df_cases = pd.DataFrame(cases, columns=config_loader.load_config()['headers'])
-                    st.session_state.df_value = df_cases
+                    st.session_state.df_value = shared_frame(("cases_by_date", selected_date), cases, editor_columns())
+                    st.session_state.df_date = selected_date
 
         if "df_value" in st.session_state:
-            df_cases = st.session_state.df_value
+            df_cases = editor_frame(st.session_state.df_value)
 
-            column_config = {col: st.column_config.Column(disabled=True) for col in df_cases.columns if
-                             col not in ["Upcoming Date", "Stage"]}
+            column_config = editor_column_config(df_cases)
 
             edited_df = st.data_editor(
                 df_cases,
                 num_rows="fixed",
+                hide_index=True,
                 column_config=column_config,
             )
             if st.button("Update Cases"):
                 update_cases_and_previous_dates(self, edited_df, selected_date)
 
+    def week_calendar(self):
+        st.header("Weekly Calendar")
+        picked = st.date_input("Week of", value=date.today(), key="calendar_week")
+        week_start = picked - timedelta(days=picked.weekday())
+        week_end = week_start + timedelta(days=6)
+        # One range query feeds both the grid and the day drill-down
+        cases = self.controller.get_cases_between(week_start, week_end)
+        st.write(f"{week_start:%d %b %Y} to {week_end:%d %b %Y}: {len(cases)} hearings")
+
+        days = [week_start + timedelta(days=offset) for offset in range(7)]
+        day_labels = [f"{day:%a %d %b}" for day in days]
+        locations = config_loader.load_config().locations
+        load = pd.DataFrame(0, index=locations, columns=day_labels)
+        cases_by_day = {day: [] for day in days}
+        for case in cases:
+            cases_by_day[case.upcoming_date].append(case)
+            if case.location not in load.index:
+                load.loc[case.location] = 0
+            load.loc[case.location, day_labels[(case.upcoming_date - week_start).days]] += 1
+        load.loc["Total"] = load.sum()
+        st.dataframe(load, width="stretch")
+
+        for day, label in zip(days, day_labels):
+            day_cases = cases_by_day[day]
+            if not day_cases:
+                continue
+            # Only the expanded day builds its frame
+            if st.toggle(f"{label} ({len(day_cases)})", key=f"calendar_day_{day.isoformat()}"):
+                st.dataframe(shared_frame(("calendar_day", day), day_cases, display_columns()), hide_index=True)
+
     def pending_cases(self):
         st.header("Pending Cases")
-        cases = self.controller.get_pending_cases()
+        cases = keyset_pages(
+            "pending_cases",
+            self.controller.get_pending_cases_page,
+            lambda case: (case.upcoming_date, case.id)
+        )
         if not cases:
             st.write("No pending cases found.")
         else:
-            df_cases = pd.DataFrame(cases, columns=config_loader.load_config()['headers'])
-            st.dataframe(df_cases)
\ No newline at end of file
+            df_cases = shared_frame(("pending_page", cases[0].id), cases, display_columns())
+            st.dataframe(df_cases, hide_index=True)
+
+
+def _remove_export(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
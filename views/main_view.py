@@ -1,18 +1,17 @@
 import streamlit as st
+from models import instrumentation, schema
+from views import admin_view
 from views.case_view import CaseView
 
 
-def set_custom_style():
-    hide_st_style = """
+# Injected on every full run; kept as one constant so it is built once per process
+CUSTOM_STYLE = """
             <style>
             #MainMenu {visibility: hidden;}
             footer {visibility: hidden;}
             header {visibility: hidden;}
             </style>
-            """
-    st.markdown(hide_st_style, unsafe_allow_html=True)
 
-    st.markdown("""
         <style>
             /* Main layout */
             .main .block-container {
@@ -110,54 +109,84 @@ def set_custom_style():
                 background-color: #1C3366;
             }
         </style>
-    """, unsafe_allow_html=True)
+"""
+
+
+def set_custom_style():
+    st.markdown(CUSTOM_STYLE, unsafe_allow_html=True)
+
+
+@st.cache_resource
+def get_case_view():
+    # CaseView holds no per-session state, so one instance serves every session
+    return CaseView()
+
+
+@st.fragment
+def render_page():
+    """Render the current page; widget changes inside it rerun only this fragment."""
+    page = st.session_state.page
+    case_view = get_case_view()
+    with instrumentation.rerun_timer("fragment", page), instrumentation.page_timer(page):
+        if page == "home":
+            st.write("## Welcome to the Case Management System")
+            st.write("Select an option from the sidebar to get started.")
+            case_view.dashboard()
+        elif page == "add_case":
+            case_view.add_case()
+        elif page == "import_cases":
+            case_view.import_cases()
+        elif page == "search_case":
+            case_view.search_case()
+        elif page == "todays_case_list":
+            case_view.todays_case_list()
+        elif page == "cases_by_date":
+            case_view.cases_by_date()
+        elif page == "week_calendar":
+            case_view.week_calendar()
+        elif page == "pending_cases":
+            case_view.pending_cases()
+        elif page == "cases_by_company_name":
+            case_view.search_cases_by_company_name()
+        elif page == "export_cases":
+            case_view.export_cases()
+        elif page == "update_case":
+            case_view.update_case()
+        elif page == "performance":
+            admin_view.performance_panel()
 
 
 def main():
     st.set_page_config(page_title="⚖️ Case Management System", layout="wide")
-    set_custom_style()
-
-    st.markdown('<h1 class="main-title">⚖️ Case Management System</h1>', unsafe_allow_html=True)
-
-    case_view = CaseView()
-
-    # Sidebar navigation
-    with st.sidebar:
-        nav_options = {
-            "🏠 Home": "home",
-            "➕ Add New Case": "add_case",
-            "🔍 Search Case": "search_case",
-            "📅 Today's Case List": "todays_case_list",
-            "📆 Cases by Date": "cases_by_date",
-            "⏳ Pending Cases": "pending_cases",
-            "🏢 Cases By Company Name": "cases_by_company_name",
-            "✍️ Update Case": "update_case"
-        }
-        for label, page in nav_options.items():
-            if st.button(label):
-                st.session_state.page = page
-
-    # Main content area
-    with st.container():
-        if "page" not in st.session_state:
-            st.session_state.page = "home"
-
-        content = st.container()
-        with content:
-            if st.session_state.page == "home":
-                st.write("## Welcome to the Case Management System")
-                st.write("Select an option from the sidebar to get started.")
-            elif st.session_state.page == "add_case":
-                case_view.add_case()
-            elif st.session_state.page == "search_case":
-                case_view.search_case()
-            elif st.session_state.page == "todays_case_list":
-                case_view.todays_case_list()
-            elif st.session_state.page == "cases_by_date":
-                case_view.cases_by_date()
-            elif st.session_state.page == "pending_cases":
-                case_view.pending_cases()
-            elif st.session_state.page == "cases_by_company_name":
-                case_view.search_cases_by_company_name()
-            elif st.session_state.page == "update_case":
-                case_view.update_case()
\ No newline at end of file
+    if "page" not in st.session_state:
+        st.session_state.page = "home"
+
+    with instrumentation.rerun_timer("app", st.session_state.page):
+        set_custom_style()
+        schema.ensure_schema()
+
+        st.markdown('<h1 class="main-title">⚖️ Case Management System</h1>', unsafe_allow_html=True)
+
+        # Sidebar navigation
+        with st.sidebar:
+            nav_options = {
+                "🏠 Home": "home",
+                "➕ Add New Case": "add_case",
+                "📥 Import Cases": "import_cases",
+                "🔍 Search Case": "search_case",
+                "📅 Today's Case List": "todays_case_list",
+                "📆 Cases by Date": "cases_by_date",
+                "🗓️ Weekly Calendar": "week_calendar",
+                "⏳ Pending Cases": "pending_cases",
+                "🏢 Cases By Company Name": "cases_by_company_name",
+                "📤 Export Cases": "export_cases",
+                "✍️ Update Case": "update_case",
+                "📊 Performance": "performance"
+            }
+            for label, page in nav_options.items():
+                # Set before the page renders, so one click switches pages in one run
+                st.button(label, on_click=st.session_state.update, kwargs={"page": page})
+
+        # Main content area
+        with st.container():
+            render_page()
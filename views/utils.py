@@ -1,84 +1,155 @@
+import threading
+from collections import OrderedDict
+
 import streamlit as st
-from models.database import get_connection
-from controllers.case_controller import CaseController
+from models.records import COLUMN_HEADERS, display_columns, patch_case_frame, records_to_frame
 import config_loader
 import pandas as pd
 def go_to_main_page_button():
     st.button("Go to Main Page", on_click=lambda: st.session_state.update(page="home"))
 
-def update_case_dates(case_id, upcoming_date, table_name="case_records"):
-    conn = get_connection()  # Assuming get_connection() is defined to connect to your PostgreSQL DB
-    cur = conn.cursor()
+PAGE_SIZES = [25, 50, 100, 250]
+
 
-    # Fetch the existing upcoming_date and previous_dates
-    fetch_query = f"""
-        SELECT upcoming_date, previous_dates
-        FROM {table_name}
-        WHERE id = %s
+def keyset_pages(state_key, fetch_page, row_key):
+    """Render page controls for a keyset-paginated query and return the current page.
+
+    fetch_page(after, limit) returns rows after the keyset value `after`
+    (None for the first page); row_key(row) gives a row's keyset value.
+    Only the boundary of each visited page is kept in session state.
     """
-    cur.execute(fetch_query, (case_id,))
-    result = cur.fetchone()
-
-    if result is not None:
-        current_upcoming_date, previous_dates = result
-
-        # Convert previous_dates to a list
-        if previous_dates:
-            previous_dates_list = previous_dates.split(", ")
-        else:
-            previous_dates_list = []
-
-        # Check if the upcoming date is in the previous dates list
-        if str(current_upcoming_date) not in previous_dates_list:
-            previous_dates_list.append(str(current_upcoming_date))
-
-        # Check if the new upcoming date is not already in the previous dates list
-        if str(upcoming_date) in previous_dates_list:
-            return "The upcoming date is already present in the previous dates list."
-
-        # Update the previous_dates and upcoming_date columns
-        update_query = f"""
-            UPDATE {table_name} SET
-                upcoming_date = %s,
-                previous_dates = %s
-            WHERE id = %s
-        """
-        cur.execute(update_query, (
-            upcoming_date, 
-            ", ".join(previous_dates_list),
-            case_id
-        ))
-
-        conn.commit()
-        cur.close()
-        conn.close()
-        
-        return "Case updated successfully."
-    else:
-        cur.close()
-        conn.close()
-        return "Case not found."
+    page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{state_key}_page_size")
+    cursors = st.session_state.setdefault(state_key, [None])
+    # One extra row tells us whether a next page exists without a COUNT(*)
+    rows = fetch_page(cursors[-1], page_size + 1)
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+
+    previous_col, next_col, label_col = st.columns([1, 1, 4])
+    if previous_col.button("Previous", disabled=len(cursors) == 1, key=f"{state_key}_previous"):
+        cursors.pop()
+        st.rerun(scope="fragment")
+    if next_col.button("Next", disabled=not has_next, key=f"{state_key}_next"):
+        cursors.append(row_key(rows[-1]))
+        st.rerun(scope="fragment")
+    label_col.write(f"Page {len(cursors)}")
+    return rows
+
+
+# Frames of query results, shared by every session in the process
+FRAME_CACHE_SIZE = 128
+_frames = OrderedDict()  # key -> (rows, frame)
+_frames_lock = threading.Lock()
+
+
+def shared_frame(key, rows, columns):
+    """records_to_frame(rows, columns), built once per process for `key`.
+
+    Sessions showing the same result get the same frame, so it must not be
+    modified (patch_case_frame works on a copy). The frame is rebuilt when
+    the rows behind `key` change.
+    """
+    rows = tuple(rows)
+    key = (key, columns)
+    with _frames_lock:
+        entry = _frames.get(key)
+        if entry is not None and entry[0] == rows:
+            _frames.move_to_end(key)
+            return entry[1]
+    frame = records_to_frame(rows, columns)
+    with _frames_lock:
+        _frames[key] = (rows, frame)
+        _frames.move_to_end(key)
+        while len(_frames) > FRAME_CACHE_SIZE:
+            _frames.popitem(last=False)
+    return frame
+
+
+# The columns update_cases_batch saves for each changed row
+BATCH_HEADERS = ("Upcoming Date", "Stage")
+
+
+def editor_column_config(df):
+    # Only the editableHeaders can change; Upcoming Date is datetime64 in the
+    # frame but edited with a date picker.
+    editable_headers = config_loader.load_config().editable_headers
+    column_config = {col: st.column_config.Column(disabled=True) for col in df.columns if col not in editable_headers}
+    if "Upcoming Date" in editable_headers:
+        column_config["Upcoming Date"] = st.column_config.DateColumn(format="YYYY-MM-DD")
+    return column_config
+
+
+def editor_columns():
+    # Saves need the ID, the version, every editable column and what a batch
+    # save writes, shown or not
+    editable_headers = config_loader.load_config().editable_headers
+    saved_headers = (*editable_headers, *BATCH_HEADERS)
+    return display_columns(("id", "version", *(column for column, header in COLUMN_HEADERS.items() if header in saved_headers)))
+
+
+def editor_frame(df):
+    # version stays in session state for the stale check; the browser never needs it
+    return df.drop(columns="version", errors="ignore")
+
+
+def _editable_values(df, headers):
+    values = df.set_index("ID")[list(headers)].copy()
+    if "Upcoming Date" in values:
+        values["Upcoming Date"] = pd.to_datetime(values["Upcoming Date"], errors="coerce").dt.date
+    # NaN/NaT become None, so a cleared cell saves as NULL
+    return values.astype(object).where(values.notna(), None)
+
+
+def changed_case_rows(original_df, edited_df):
+    """Return [(case_id, upcoming_date, stage, version)] for rows whose editable cells differ.
+
+    Only the editableHeaders are compared; version is the one the row was
+    loaded at (None if the frame has none).
+    """
+    editable_headers = config_loader.load_config().editable_headers
+    original = _editable_values(original_df, editable_headers)
+    edited = _editable_values(edited_df, editable_headers).reindex(original.index)
+    # Missing on both sides is not a change (None != None is True in pandas)
+    differs = edited.ne(original) & ~(edited.isna() & original.isna())
+    saved = _editable_values(edited_df, BATCH_HEADERS)
+    versions = original_df.set_index("ID")["version"] if "version" in original_df else {}
+    return [
+        (int(case_id), saved.at[case_id, "Upcoming Date"], saved.at[case_id, "Stage"],
+         int(versions[case_id]) if case_id in versions else None)
+        for case_id in original.index[differs.any(axis=1)]
+    ]
+
 
 def update_cases_and_previous_dates(self, edited_df, selected_date):
-    if edited_df is not None:
-        if "df_value" in st.session_state:
-            # Create an instance of CaseController to call its methods
-            controller = CaseController()
-            # Update cases in the database
-            update_status = ""
-            for _, row in edited_df.iterrows():
-                case_id = row['ID']  # Replace 'ID' with the actual column name for case IDs
-                new_upcoming_date = row['Upcoming Date']  # Replace 'Upcoming Date' with the actual column name for upcoming dates
-                update_status = controller.update_cases(case_id, new_upcoming_date)  # Use the instance to call the method
-
-            # Refresh the case data after update
-            updated_cases = controller.get_cases_by_date(selected_date)  # Fetch updated data
-            if updated_cases:
-                st.session_state.df_value = pd.DataFrame(updated_cases, columns=config_loader.load_config()['headers'])
-                st.write("Cases updated successfully.")
-            else:
-                st.write(f"No cases found for {selected_date}.")
-            st.write(update_status)
-        else:
-            st.write("No changes detected.")
+    if edited_df is None or "df_value" not in st.session_state:
+        st.write("No changes detected.")
+        return
+
+    changes = changed_case_rows(st.session_state.df_value, edited_df)
+    if not changes:
+        st.write("No changes detected.")
+        return
 
+    controller = self.controller
+    try:
+        outcomes = controller.update_cases_batch(changes)
+    except Exception as e:
+        st.error(f"Error updating cases, nothing was saved: {e}")
+        return
+
+    case_numbers = st.session_state.df_value.set_index("ID").get("Case Number", {})
+    saved = [row for _, row in outcomes.values() if row is not None]
+    if saved:
+        st.success(f"{len(saved)} case(s) updated successfully.")
+    for case_id, (message, row) in outcomes.items():
+        if row is None:
+            st.warning(f"Case {case_numbers.get(case_id, case_id)}: {message}")
+
+    # Patch the saved rows into the list; cases moved to another day leave it
+    df_cases = patch_case_frame(st.session_state.df_value, saved, lambda row: row.upcoming_date == selected_date)
+    if len(df_cases):
+        st.session_state.df_value = df_cases
+    else:
+        del st.session_state.df_value
+        st.session_state.pop("df_date", None)
+        st.write(f"No cases found for {selected_date}.")